@@ -20,12 +20,22 @@ from bpy.types import AddonPreferences
 # -----------------------------------------------------------------------------
 #  内部モジュールインポート
 # -----------------------------------------------------------------------------
-from .ui_panel import PoseToolPanel, PoseConverterProperties
+from .ui_panel import (
+    PoseToolPanel,
+    PoseConverterProperties,
+    cancel_pending_pref_sync,
+)
 from .ops_convert_pose import (
     POSECONV_OT_ConvertPose,
     POSECONV_OT_SetRestPose,
 )
-from .bone_finder import POSECONV_OT_DetectBones
+from .bone_finder import POSECONV_OT_DetectBones, clear_detect_cache
+from .utils import (
+    clear_caches,
+    close_log,
+    related_mesh_cache_depsgraph_handler,
+    related_mesh_cache_undo_handler,
+)
 
 # -----------------------------------------------------------------------------
 #  AddonPreferences  ―  セッションを跨いで保持したい値
@@ -61,13 +71,27 @@ class PoseConverterPreferences(AddonPreferences):
 # -----------------------------------------------------------------------------
 #  load_post ハンドラ  ―  .blend 読込時にプリファレンスを Scene へ反映
 # -----------------------------------------------------------------------------
+def _clear_all_caches():
+    """各モジュールのキャッシュをまとめて破棄する"""
+    clear_caches()
+    clear_detect_cache()
+
+
 @persistent
 def _load_post_sync_pref_to_scene(_):
+    # 読込前のオブジェクトを指すキャッシュはすべて無効
+    _clear_all_caches()
+
     prefs = bpy.context.preferences.addons[__name__].preferences
+    shoulder = prefs.shoulder_rotation_angle
+    upperarm = prefs.upperarm_rotation_angle
     for scene in bpy.data.scenes:
         props = scene.pose_converter_props
-        props.shoulder_rotation_angle = prefs.shoulder_rotation_angle
-        props.upperarm_rotation_angle = prefs.upperarm_rotation_angle
+        # 値が同じなら書き込まない（update コールバックと通知を発生させない）
+        if props.shoulder_rotation_angle != shoulder:
+            props.shoulder_rotation_angle = shoulder
+        if props.upperarm_rotation_angle != upperarm:
+            props.upperarm_rotation_angle = upperarm
 
 # -----------------------------------------------------------------------------
 #  アドオン登録 / 解除
@@ -81,10 +105,18 @@ _classes = (
     POSECONV_OT_DetectBones,
 )
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(_classes)
+
+# 関連メッシュキャッシュを無効化するハンドラ (ハンドラリスト, 関数)
+_cache_handlers = (
+    (bpy.app.handlers.depsgraph_update_post, related_mesh_cache_depsgraph_handler),
+    (bpy.app.handlers.undo_post, related_mesh_cache_undo_handler),
+    (bpy.app.handlers.redo_post, related_mesh_cache_undo_handler),
+)
+
 
 def register():
-    for cls in _classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
 
     # Scene にツール用プロパティを追加
     bpy.types.Scene.pose_converter_props = bpy.props.PointerProperty(
@@ -94,18 +126,30 @@ def register():
     # ハンドラ追加（重複登録ガード）
     if _load_post_sync_pref_to_scene not in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.append(_load_post_sync_pref_to_scene)
+    for handlers, fn in _cache_handlers:
+        if fn not in handlers:
+            handlers.append(fn)
 
 
 def unregister():
+    # 保留中のプリファレンス同期を書き込んでからタイマーを止める
+    cancel_pending_pref_sync()
+
     # ハンドラ除去
     if _load_post_sync_pref_to_scene in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(_load_post_sync_pref_to_scene)
+    for handlers, fn in _cache_handlers:
+        if fn in handlers:
+            handlers.remove(fn)
 
     # Scene プロパティ削除
     del bpy.types.Scene.pose_converter_props
 
-    for cls in reversed(_classes):
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
+    _clear_all_caches()
+
+    # 開いたままのログファイルを閉じる
+    close_log()
 
 
 if __name__ == "__main__":
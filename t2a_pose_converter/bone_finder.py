@@ -1,36 +1,152 @@
+import re
 import bpy
 from bpy.types import Operator
-from .utils import write_log
+from .utils import write_log, log_batch
 
-def find_bone_by_keywords(armature, keywords, debug=False):
+try:
+    import ahocorasick  # pyahocorasick（任意依存）
+except ImportError:
+    ahocorasick = None
+
+# ボーンごとの詳細ログ（True の時のみ文字列を組み立てて出力）
+_DEBUG = False
+
+# -----------------------------------------------------------------------------
+#  検出キーワード（日本語の命名規則を含む）
+# -----------------------------------------------------------------------------
+_KW_SHOULDER_L = (
+    "shoulder_l", "leftshoulder", "肩_l", "shoulder.l", "l_shoulder", 
+    "shoulderl", "clavicle_l", "clavicle.l", "肩.l", "肩l", "左肩"
+)
+_KW_SHOULDER_R = (
+    "shoulder_r", "rightshoulder", "肩_r", "shoulder.r", "r_shoulder", 
+    "shoulderr", "clavicle_r", "clavicle.r", "肩.r", "肩r", "右肩"
+)
+_KW_UPPERARM_L = (
+    "upperarm_l", "leftupperarm", "上腕_l", "upperarm.l", "l_upperarm", 
+    "uppearml", "arm_l", "arm.l", "腕_l", "腕.l", "腕l", "左腕", "左上腕"
+)
+_KW_UPPERARM_R = (
+    "upperarm_r", "rightupperarm", "上腕_r", "upperarm.r", "r_upperarm", 
+    "upperarmr", "arm_r", "arm.r", "腕_r", "腕.r", "腕r", "右腕", "右上腕"
+)
+
+def _minimize(keywords):
+    """
+    部分文字列として他のキーワードを含むキーワードを取り除きます
+    
+    例: "arm_l" があれば "upperarm_l" は常に同時にマッチするため不要。
+    「いずれかを含むか」の判定結果は変わらず、元の並び順を保ちます。
+    """
+    kept = []
+    for k in sorted(keywords, key=len):
+        if not any(short in k for short in kept):
+            kept.append(k)
+    return tuple(k for k in keywords if k in kept)
+
+_KEYWORD_GROUPS = (
+    ("shoulder_l", _minimize(_KW_SHOULDER_L)),
+    ("shoulder_r", _minimize(_KW_SHOULDER_R)),
+    ("upperarm_l", _minimize(_KW_UPPERARM_L)),
+    ("upperarm_r", _minimize(_KW_UPPERARM_R)),
+)
+
+# ASCII のボーン名には日本語キーワードがマッチし得ないため、ASCII 分のみで照合する
+_KEYWORD_GROUPS_ASCII = tuple(
+    (slot, tuple(k for k in keywords if k.isascii()))
+    for slot, keywords in _KEYWORD_GROUPS
+)
+
+_automata = {}  # _get_automaton() で初回のみ構築（ascii_only → オートマトン）
+
+# 検出結果キャッシュ  { アーマチュアのオブジェクト名: (ボーン名タプル, 検出結果) }
+_detect_cache = {}
+
+def clear_detect_cache():
+    """検出結果キャッシュを破棄（.blend 読込時など、ポインタが無効になる時に呼ぶ）"""
+    _detect_cache.clear()
+
+class _RegexAutomaton:
     """
-    指定されたキーワードに基づいてアーマチュア内のボーンを検索します
+    pyahocorasick が利用できない場合のフォールバック
+    
+    スロットごとにキーワードを 1 つの正規表現（選択）にコンパイルし、
+    ahocorasick.Automaton.iter と同じ (終端位置, スロット名) を返します。
+    """
+
+    def __init__(self, keyword_groups):
+        self._patterns = tuple(
+            (slot, re.compile("|".join(map(re.escape, keywords))))
+            for slot, keywords in keyword_groups
+            if keywords
+        )
+
+    def iter(self, text):
+        for slot, pattern in self._patterns:
+            m = pattern.search(text)
+            if m:
+                yield m.end() - 1, slot
+
+def _build_automaton(keyword_groups):
+    """
+    全スロットのキーワードから 1 つのマルチパターン検索オートマトンを構築します
     
     Parameters:
-        armature: アーマチュアオブジェクト
-        keywords: 検索キーワードのリスト
-        debug: デバッグ出力を有効にするかどうか
+        keyword_groups: (スロット名, キーワードのリスト) のシーケンス
     
     Returns:
-        見つかったボーン名または空文字列
+        iter(text) で (終端位置, スロット名) を列挙するオートマトン
     """
-    if debug:
-        write_log(f"Searching for bones with keywords: {keywords}")
-        
-    for bone in armature.pose.bones:
-        name_lower = bone.name.lower()
-        if debug:
-            write_log(f"Checking bone: {bone.name}")
-            
+    if ahocorasick is None:
+        return _RegexAutomaton(keyword_groups)
+    
+    automaton = ahocorasick.Automaton()
+    for slot, keywords in keyword_groups:
         for k in keywords:
-            if k in name_lower:
-                if debug:
-                    write_log(f"Match found: {bone.name} contains {k}")
-                return bone.name
-                
-    if debug:
-        write_log(f"No bones found matching keywords: {keywords}")
-    return ""
+            automaton.add_word(k, slot)
+    automaton.make_automaton()
+    return automaton
+
+def _get_automaton(ascii_only=False):
+    """キーワードグループのオートマトンを返す（モジュールにキャッシュ）"""
+    automaton = _automata.get(ascii_only)
+    if automaton is None:
+        groups = _KEYWORD_GROUPS_ASCII if ascii_only else _KEYWORD_GROUPS
+        automaton = _automata[ascii_only] = _build_automaton(groups)
+    return automaton
+
+def _detect_bone_slots(bone_names):
+    """
+    ボーン名を 1 回だけ走査し、全スロットのボーンを同時に検出します
+    
+    Parameters:
+        bone_names: ボーン名のリスト（pose.bones.keys() のスナップショット）
+    
+    Returns:
+        スロット名 → ボーン名（未検出は空文字列）の辞書
+    """
+    full_automaton = _get_automaton()
+    ascii_automaton = _get_automaton(ascii_only=True)
+    slots = {slot: "" for slot, _ in _KEYWORD_GROUPS}
+    remaining = len(slots)
+    
+    for name in bone_names:
+        # 大半を占める ASCII 名は日本語キーワードを除いたオートマトンで照合
+        automaton = ascii_automaton if name.isascii() else full_automaton
+        # 小文字化はボーンごとに 1 回だけ行い、全スロットの照合で共有する
+        for _end, slot in automaton.iter(name.lower()):
+            # 各スロットには最初にマッチしたボーンを割り当てる
+            if not slots[slot]:
+                slots[slot] = name
+                remaining -= 1
+                if _DEBUG:
+                    write_log("Match found: %s -> %s", name, slot)
+        
+        # 全スロットが埋まったら残りのボーンは走査しない
+        if not remaining:
+            break
+    
+    return slots
 
 class POSECONV_OT_DetectBones(Operator):
     bl_idname = "poseconv.detect_bones"
@@ -38,64 +154,51 @@ class POSECONV_OT_DetectBones(Operator):
     bl_description = "Automatically detect shoulder and upper arm bones from known patterns"
 
     def execute(self, context):
-        obj = context.object
-        props = context.scene.pose_converter_props
+        with log_batch():
+            obj = context.object
+            props = context.scene.pose_converter_props
 
-        if not obj or obj.type != 'ARMATURE':
-            self.report({'WARNING'}, "Please select a valid Armature object.")
-            write_log("Bone detection failed: No valid armature selected")
-            return {'CANCELLED'}
+            if not obj or obj.type != 'ARMATURE':
+                self.report({'WARNING'}, "Please select a valid Armature object.")
+                write_log("Bone detection failed: No valid armature selected")
+                return {'CANCELLED'}
 
-        write_log("Starting bone detection...")
-        arm = obj
-        
-        # 日本語の命名規則を含むキーワードセット
-        props.shoulder_l = find_bone_by_keywords(arm, [
-            "shoulder_l", "leftshoulder", "肩_l", "shoulder.l", "l_shoulder", 
-            "shoulderl", "clavicle_l", "clavicle.l", "肩.l", "肩l", "左肩"
-        ], debug=True)
-        
-        props.shoulder_r = find_bone_by_keywords(arm, [
-            "shoulder_r", "rightshoulder", "肩_r", "shoulder.r", "r_shoulder", 
-            "shoulderr", "clavicle_r", "clavicle.r", "肩.r", "肩r", "右肩"
-        ], debug=True)
-        
-        props.upperarm_l = find_bone_by_keywords(arm, [
-            "upperarm_l", "leftupperarm", "上腕_l", "upperarm.l", "l_upperarm", 
-            "uppearml", "arm_l", "arm.l", "腕_l", "腕.l", "腕l", "左腕", "左上腕"
-        ], debug=True)
-        
-        props.upperarm_r = find_bone_by_keywords(arm, [
-            "upperarm_r", "rightupperarm", "上腕_r", "upperarm.r", "r_upperarm", 
-            "upperarmr", "arm_r", "arm.r", "腕_r", "腕.r", "腕r", "右腕", "右上腕"
-        ], debug=True)
-
-        # ボーン検出結果をログに記録
-        detection_result = {
-            "shoulder_l": props.shoulder_l,
-            "shoulder_r": props.shoulder_r,
-            "upperarm_l": props.upperarm_l,
-            "upperarm_r": props.upperarm_r
-        }
-        
-        write_log(f"Bone detection results: {detection_result}")
-        
-        detected_count = sum(1 for v in detection_result.values() if v)
-        
-        if detected_count == 0:
-            self.report({'WARNING'}, "No bones detected. Please manually specify bone names.")
-            write_log("Bone detection failed: No bones matched the known patterns")
-        elif detected_count < 4:
-            self.report({'INFO'}, f"Partial detection: {detected_count}/4 bones found. Please check or specify the remaining bones.")
-            write_log(f"Partial bone detection: {detected_count}/4 bones detected")
-        else:
-            self.report({'INFO'}, "Bone detection complete: All bones successfully detected!")
-            write_log("Bone detection complete: All bones successfully detected")
+            write_log("Starting bone detection...")
+            arm = obj
             
-        return {'FINISHED'}
+            # RNA コレクションを辿るのは名前のスナップショット取得時の 1 回だけ
+            bone_names = tuple(arm.pose.bones.keys())
+            
+            # 同じアーマチュアでボーン構成が変わっていなければ前回の結果を再利用
+            cache_key = arm.name
+            cached = _detect_cache.get(cache_key)
+            if cached is not None and cached[0] == bone_names:
+                detection_result = dict(cached[1])
+                write_log("Using cached bone detection results")
+            else:
+                detection_result = _detect_bone_slots(bone_names)
+                _detect_cache[cache_key] = (bone_names, dict(detection_result))
+            
+            props.shoulder_l = detection_result["shoulder_l"]
+            props.shoulder_r = detection_result["shoulder_r"]
+            props.upperarm_l = detection_result["upperarm_l"]
+            props.upperarm_r = detection_result["upperarm_r"]
 
-def register():
-    bpy.utils.register_class(POSECONV_OT_DetectBones)
+            # ボーン検出結果をログに記録
+            write_log(f"Bone detection results: {detection_result}")
+            
+            detected_count = sum(1 for v in detection_result.values() if v)
+            
+            if detected_count == 0:
+                self.report({'WARNING'}, "No bones detected. Please manually specify bone names.")
+                write_log("Bone detection failed: No bones matched the known patterns")
+            elif detected_count < 4:
+                self.report({'INFO'}, f"Partial detection: {detected_count}/4 bones found. Please check or specify the remaining bones.")
+                write_log(f"Partial bone detection: {detected_count}/4 bones detected")
+            else:
+                self.report({'INFO'}, "Bone detection complete: All bones successfully detected!")
+                write_log("Bone detection complete: All bones successfully detected")
+                
+            return {'FINISHED'}
 
-def unregister():
-    bpy.utils.unregister_class(POSECONV_OT_DetectBones)
\ No newline at end of file
+register, unregister = bpy.utils.register_classes_factory((POSECONV_OT_DetectBones,))
\ No newline at end of file
@@ -2,6 +2,7 @@ import bpy
 from bpy.types import Operator
 from math import radians
 import mathutils
+import numpy as np
 from .utils import (
     get_shape_key_values,
     restore_shape_key_values,
@@ -9,42 +10,81 @@ from .utils import (
     remove_shape_key,
     write_log,
     find_related_mesh_objects,
-    apply_new_armature_modifier
+    apply_new_armature_modifier,
+    suspend_viewport_evaluation,
+    get_armature_deformed_coords,
+    get_deforming_bone_names,
+    is_deformed_by_bones,
+    log_batch,
 )
 
-def rotate_bone_y_global(pbone, angle_deg, axis='Y'):
+try:
+    from numba import njit, prange  # Numba（任意依存）
+except ImportError:
+    njit = None
+
+# 行列・回転値などの詳細ログ（True の時のみ文字列を組み立てて出力）
+_DEBUG = False
+
+# この頂点数以上のメッシュでは Numba の並列カーネルで変形量を加算する
+_NUMBA_MIN_VERTS = 50_000
+# Numba カーネルに一度に渡すシェイプキー数（全キー分の配列は確保しない）
+_NUMBA_CHUNK_ROWS = 8
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _apply_delta_stacked(coords, delta):
+        """(シェイプキー数, 頂点数*3) の座標配列の各行に delta を加算する（行ごとに並列）"""
+        n, m = coords.shape
+        for r in prange(n):
+            for j in range(m):
+                coords[r, j] += delta[j]
+else:
+    _apply_delta_stacked = None
+
+def rotate_bone_y_global(pbone, angle_deg, axis='Y', rot_matrix=None, arm_mw=None, arm_mw_inv=None):
     """ボーン頭を支点にグローバル軸周りにボーンを回転させる関数
     
     Parameters:
         pbone: 回転させるポーズボーン
         angle_deg: 回転角度（度数法）
         axis: 回転軸 ('X', 'Y', 'Z'のいずれか)
+        rot_matrix: 作成済みの 3x3 回転行列（省略時は angle_deg と axis から作成）
+        arm_mw: アーマチュアのワールド行列（省略時は pbone から取得）
+        arm_mw_inv: arm_mw の逆行列（省略時はここで計算）
     """
-    # 角度をラジアンに変換
-    angle_rad = radians(angle_deg)
-    
-    # アーマチュアオブジェクトを取得
-    armature = pbone.id_data
+    # 回転角度がゼロなら行列計算もログも不要
+    if angle_deg == 0.0:
+        return
     
     # グローバル軸での回転行列を作成
-    rot_matrix = mathutils.Matrix.Rotation(angle_rad, 4, axis)
+    if rot_matrix is None:
+        rot_matrix = mathutils.Matrix.Rotation(radians(angle_deg), 3, axis)
+    
+    # アーマチュアのワールド行列（複数ボーンを回す場合は呼び出し側で一度だけ求めて渡す）
+    if arm_mw is None:
+        arm_mw = pbone.id_data.matrix_world
+    if arm_mw_inv is None:
+        arm_mw_inv = arm_mw.inverted()
     
     # 現在のワールド行列とボーン頭のワールド座標を取得
-    world_mat = armature.matrix_world @ pbone.matrix
-    head_world = armature.matrix_world @ pbone.head  # 回転の支点
+    world_mat = arm_mw @ pbone.matrix
+    head_world = arm_mw @ pbone.head  # 回転の支点
     
-    # 支点を原点に移動 → 回転 → 元に戻す
-    translate_to_origin = mathutils.Matrix.Translation(-head_world)
-    translate_back = mathutils.Matrix.Translation(head_world)
-    new_world_mat = translate_back @ rot_matrix @ translate_to_origin @ world_mat
+    # 支点を原点に移動 → 回転 → 元に戻す T(p)·R·T(-p) を直接構築
+    # （回転成分は R、平行移動成分は p - R·p）
+    pivot_rot = rot_matrix.to_4x4()
+    pivot_rot.translation = head_world - rot_matrix @ head_world
+    new_world_mat = pivot_rot @ world_mat
     
     # ローカル座標に戻して適用
-    pbone.matrix = armature.matrix_world.inverted() @ new_world_mat
+    pbone.matrix = arm_mw_inv @ new_world_mat
     
     # デバッグログを追加
-    write_log(f"Rotated bone {pbone.name} by {angle_deg} degrees around global {axis} axis")
-    write_log(f"  Original matrix: {world_mat}")
-    write_log(f"  New matrix: {new_world_mat}")
+    write_log("Rotated bone %s by %s degrees around global %s axis", pbone.name, angle_deg, axis)
+    if _DEBUG:
+        write_log("  Original matrix: %s", world_mat)
+        write_log("  New matrix: %s", new_world_mat)
 
 
 def apply_as_rest_pose(armature_obj):
@@ -55,22 +95,18 @@ def apply_as_rest_pose(armature_obj):
     # アーマチュアをアクティブにする
     bpy.context.view_layer.objects.active = armature_obj
     
-    # オブジェクトモードに切り替え
-    if original_mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # ポーズモードに切り替え
-    bpy.ops.object.mode_set(mode='POSE')
+    # ポーズモードに切り替え（既にポーズモードなら何もしない）
+    if original_mode != 'POSE':
+        if original_mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.ops.object.mode_set(mode='POSE')
     
     # 現在のポーズをレストポーズとして適用
     bpy.ops.pose.armature_apply()
     
-    # オブジェクトモードに戻す
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # 元のモードに戻す（ポーズモードだった場合）
-    if original_mode == 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
+    # 元がポーズモード以外ならオブジェクトモードに戻す
+    if original_mode != 'POSE':
+        bpy.ops.object.mode_set(mode='OBJECT')
     
     write_log("Applied current pose as rest pose")
 
@@ -89,88 +125,124 @@ def rotate_bones_for_pose_conversion(arm_obj, bone_mapping, shoulder_angle, uppe
     try:
         write_log("Rotating bones...")
         
-        # 左側のボーンの回転処理（角度をそのまま使用）
-        for bone_type in ["shoulder", "upperarm"]:
-            bone_name = bone_mapping.get(f"{bone_type}_l", "")
-            if bone_name and bone_name in arm_obj.pose.bones:
-                write_log(f"Processing left {bone_type} bone: {bone_name}")
-                bone = arm_obj.pose.bones[bone_name]
-                
-                # 回転前の状態をログ出力
-                if bone.rotation_mode == 'QUATERNION':
-                    write_log(f"  Before rotation - quaternion: {bone.rotation_quaternion}")
-                else:
-                    write_log(f"  Before rotation - euler: {bone.rotation_euler}")
-                
-                # 回転実行（左側は角度をそのまま使用）
-                angle = shoulder_angle if bone_type == "shoulder" else upperarm_angle
-                rotate_bone_y_global(bone, angle)
-                
-                # 回転後の状態をログ出力
-                if bone.rotation_mode == 'QUATERNION':
-                    write_log(f"  After rotation - quaternion: {bone.rotation_quaternion}")
-                else:
-                    write_log(f"  After rotation - euler: {bone.rotation_euler}")
-        
-        # 右側のボーンの回転処理（角度を反転）
-        for bone_type in ["shoulder", "upperarm"]:
-            bone_name = bone_mapping.get(f"{bone_type}_r", "")
-            if bone_name and bone_name in arm_obj.pose.bones:
-                write_log(f"Processing right {bone_type} bone: {bone_name}")
-                bone = arm_obj.pose.bones[bone_name]
-                
-                # 回転前の状態をログ出力
+        # ワールド行列・逆行列と回転行列は全ボーンで共通なので一度だけ作成
+        # 右側の回転 R(-θ) は直交行列 R(θ) の転置に等しいので作り直さない
+        arm_mw = arm_obj.matrix_world.copy()
+        arm_mw_inv = arm_mw.inverted()
+        shoulder_rot = mathutils.Matrix.Rotation(radians(shoulder_angle), 3, 'Y')
+        upperarm_rot = mathutils.Matrix.Rotation(radians(upperarm_angle), 3, 'Y')
+        
+        # (ボーン名, 回転角度, 回転行列) の処理リスト（右側は角度を反転、順序は 左肩→左上腕→右肩→右上腕）
+        jobs = (
+            (bone_mapping.get("shoulder_l", ""), shoulder_angle, shoulder_rot),
+            (bone_mapping.get("upperarm_l", ""), upperarm_angle, upperarm_rot),
+            (bone_mapping.get("shoulder_r", ""), -shoulder_angle, shoulder_rot.transposed()),
+            (bone_mapping.get("upperarm_r", ""), -upperarm_angle, upperarm_rot.transposed()),
+        )
+        
+        pose_bones = arm_obj.pose.bones
+        for bone_name, angle, rot_matrix in jobs:
+            # 角度ゼロのボーンは回転させない
+            if angle == 0.0:
+                continue
+            bone = pose_bones.get(bone_name) if bone_name else None
+            if bone is None:
+                continue
+            
+            write_log(f"Processing bone: {bone_name}")
+            
+            # 回転前の状態をログ出力
+            if _DEBUG:
                 if bone.rotation_mode == 'QUATERNION':
-                    write_log(f"  Before rotation - quaternion: {bone.rotation_quaternion}")
+                    write_log("  Before rotation - quaternion: %s", bone.rotation_quaternion)
                 else:
-                    write_log(f"  Before rotation - euler: {bone.rotation_euler}")
-                
-                # 回転実行（右側は角度を反転）
-                angle = shoulder_angle if bone_type == "shoulder" else upperarm_angle
-                rotate_bone_y_global(bone, -angle)  # 右側は角度を反転
-                
-                # 回転後の状態をログ出力
+                    write_log("  Before rotation - euler: %s", bone.rotation_euler)
+            
+            rotate_bone_y_global(bone, angle, rot_matrix=rot_matrix,
+                                 arm_mw=arm_mw, arm_mw_inv=arm_mw_inv)
+            
+            # 回転後の状態をログ出力
+            if _DEBUG:
                 if bone.rotation_mode == 'QUATERNION':
-                    write_log(f"  After rotation - quaternion: {bone.rotation_quaternion}")
+                    write_log("  After rotation - quaternion: %s", bone.rotation_quaternion)
                 else:
-                    write_log(f"  After rotation - euler: {bone.rotation_euler}")
+                    write_log("  After rotation - euler: %s", bone.rotation_euler)
         
-        # ビューレイヤーの更新（重要）
-        bpy.context.view_layer.update()
-        write_log("View layer updated after bone rotation")
+        # ここではビューレイヤーを更新しない。回転後のポーズを最初に読むのは
+        # _run_rest_pose_pipeline の evaluated_depsgraph_get() で、そこで一度だけ評価される
+        # （それより前に評価済みデータやポーズ行列を参照する処理を挟まないこと）
         return True
         
     except Exception as e:
         write_log(f"Error during bone rotation: {e}")
         return False
 
-def save_mesh_as_shape_key(arm_obj, mesh_obj, report_fn):
+def _find_armature_modifier(mesh_obj, arm_obj):
+    """arm_obj を対象とする最初のアーマチュアモディファイアを返す（無ければ None）"""
+    for mod in mesh_obj.modifiers:
+        if mod.type == 'ARMATURE' and mod.object == arm_obj:
+            return mod
+    return None
+
+def _mesh_override(context, mesh_obj):
+    """メッシュをアクティブ・選択状態とみなすコンテキストオーバーライドを返す
+    
+    ビューレイヤーの選択状態は変更しないため、メッシュごとの再タグ付けが発生しない
+    """
+    return context.temp_override(
+        active_object=mesh_obj,
+        object=mesh_obj,
+        selected_objects=[mesh_obj],
+        selected_editable_objects=[mesh_obj],
+    )
+
+def _restore_selection(context, orig_active, orig_selected):
+    """オペレーター開始時の選択状態とアクティブオブジェクトを復元する"""
+    for obj in context.view_layer.objects:
+        if obj.select_get() and obj not in orig_selected:
+            obj.select_set(False)
+    for obj in orig_selected:
+        if obj.name in context.view_layer.objects and not obj.select_get():
+            obj.select_set(True)
+    context.view_layer.objects.active = orig_active
+
+def _work_array(buf, row, length):
+    """作業用バッファ buf の row 行目から長さ length のビューを返す（buf が None なら新規確保）"""
+    if buf is None:
+        return np.empty(length, dtype=np.float32)
+    return buf[row, :length]
+
+def _work_rows(buf, first_row, n_rows, length):
+    """作業用バッファ buf の first_row 行目から n_rows 行分のビューを返す（足りなければ新規確保）"""
+    if buf is None or buf.shape[0] < first_row + n_rows:
+        return np.empty((n_rows, length), dtype=np.float32)
+    return buf[first_row:first_row + n_rows, :length]
+
+def save_mesh_as_shape_key(arm_obj, mesh_obj, report_fn, depsgraph=None, deforming_bones=None, deltas=None,
+                           buf=None):
     """メッシュの現在の変形をシェイプキーとして保存する（レストポーズ適用前の処理）
     
+    deltas が渡された場合、評価済みメッシュから求めた変形量（変形後 - Basis）を
+    deltas[mesh_obj.data.name]（メッシュデータ名）に格納し、一時シェイプキー 'CatHutBasicPose' は作らない。
+    評価できずオペレーターにフォールバックした場合のみシェイプキーとして保存する。
+    
     Parameters:
         arm_obj: アーマチュアオブジェクト
         mesh_obj: メッシュオブジェクト
         report_fn: レポート関数
+        depsgraph: ボーン回転後の評価済み depsgraph（省略時はオペレーターで保存）
+        deforming_bones: 現在のポーズで動くボーン名の集合（省略時は常に評価する）
+        deltas: 変形量の格納先 dict（省略時は常にシェイプキーとして保存）
+        buf: メッシュ間で使い回す作業用 float32 配列（省略時は都度確保）
     
     Returns:
         bool: 成功したかどうか
     """
     try:
         write_log(f"Saving mesh '{mesh_obj.name}' as shape key...")
-
-        # オブジェクトモードに切り替え
-        bpy.ops.object.mode_set(mode='OBJECT')
-        
-        # メッシュオブジェクトをアクティブに
-        bpy.context.view_layer.objects.active = mesh_obj
-        mesh_obj.select_set(True)
         
         # アーマチュアモディファイアを探す
-        arm_modifier = None
-        for mod in mesh_obj.modifiers:
-            if mod.type == 'ARMATURE' and mod.object == arm_obj:
-                arm_modifier = mod
-                break
+        arm_modifier = _find_armature_modifier(mesh_obj, arm_obj)
         
         if not arm_modifier:
             # アーマチュアモディファイアがない場合は作成
@@ -178,14 +250,44 @@ def save_mesh_as_shape_key(arm_obj, mesh_obj, report_fn):
             arm_modifier.object = arm_obj
             write_log(f"Created new armature modifier for mesh '{mesh_obj.name}'")
         
+        # 動いたボーンの影響を受けないメッシュは評価せず、Basis をそのまま複製する
+        if deforming_bones is not None and not is_deformed_by_bones(mesh_obj, arm_modifier, deforming_bones):
+            if deltas is not None:
+                deltas[mesh_obj.data.name] = np.zeros(len(mesh_obj.data.vertices) * 3, dtype=np.float32)
+                write_log(f"Mesh '{mesh_obj.name}' is not affected by posed bones, stored zero delta")
+                return True
+            mesh_obj.shape_key_add(name="CatHutBasicPose", from_mix=False)
+            write_log(f"Mesh '{mesh_obj.name}' is not affected by posed bones, copied Basis as 'CatHutBasicPose'")
+            return True
+        
+        # 評価済みメッシュから変形後の座標を取得し、直接シェイプキーに書き込む
+        if depsgraph is not None:
+            coords = get_armature_deformed_coords(mesh_obj, arm_modifier, depsgraph)
+            if coords is not None and deltas is not None:
+                # Basis との差分だけを保持し、シェイプキーは追加しない
+                basis_co = _work_array(buf, 0, len(coords))
+                mesh_obj.data.shape_keys.key_blocks[0].data.foreach_get("co", basis_co)
+                coords -= basis_co
+                deltas[mesh_obj.data.name] = coords
+                write_log(f"Stored current deformation delta for mesh '{mesh_obj.name}'")
+                return True
+            if coords is not None:
+                new_shape_key = mesh_obj.shape_key_add(name="CatHutBasicPose", from_mix=False)
+                new_shape_key.data.foreach_set("co", coords)
+                write_log(f"Saved current deformation as shape key 'CatHutBasicPose' for mesh '{mesh_obj.name}'")
+                return True
+            write_log(f"Evaluated mesh unavailable for '{mesh_obj.name}', falling back to modifier_apply_as_shapekey")
+        
         # 「シェイプキーとして保存」を実行
         bpy.ops.object.modifier_apply_as_shapekey(keep_modifier=True, modifier=arm_modifier.name)
         write_log(f"Saved current deformation as shape key for mesh '{mesh_obj.name}'")
         
         # 作成されたシェイプキーの名前を「CatHutBasicPose」に変更
         # 新しいシェイプキーは通常、最後に追加される
-        if mesh_obj.data.shape_keys and len(mesh_obj.data.shape_keys.key_blocks) > 0:
-            new_shape_key = mesh_obj.data.shape_keys.key_blocks[-1]
+        shape_keys = mesh_obj.data.shape_keys
+        kbs = shape_keys.key_blocks if shape_keys else ()
+        if len(kbs) > 0:
+            new_shape_key = kbs[len(kbs) - 1]
             original_shape_key_name = new_shape_key.name  # あとで使用するために保存
             new_shape_key.name = "CatHutBasicPose"
             write_log(f"Renamed shape key from '{original_shape_key_name}' to 'CatHutBasicPose' for mesh '{mesh_obj.name}'")
@@ -200,12 +302,14 @@ def save_mesh_as_shape_key(arm_obj, mesh_obj, report_fn):
         report_fn({'ERROR'}, f"Failed to save mesh as shape key: {e}")
         return False
 
-def process_shape_keys_after_rest_pose(mesh_obj, report_fn):
+def process_shape_keys_after_rest_pose(mesh_obj, report_fn, delta=None, buf=None):
     """レストポーズ適用後のシェイプキー処理
     
     Parameters:
         mesh_obj: メッシュオブジェクト
         report_fn: レポート関数
+        delta: save_mesh_as_shape_key で求めた変形量（省略時は 'CatHutBasicPose' から求める）
+        buf: メッシュ間で使い回す作業用 float32 配列（省略時は都度確保）
     
     Returns:
         bool: 成功したかどうか
@@ -213,86 +317,85 @@ def process_shape_keys_after_rest_pose(mesh_obj, report_fn):
     try:
         write_log(f"Processing shape keys after rest pose for mesh '{mesh_obj.name}'...")
         
-        # メッシュオブジェクトをアクティブに
-        bpy.context.view_layer.objects.active = mesh_obj
-        mesh_obj.select_set(True)
-        
         # シェイプキーがあるか確認
         if not mesh_obj.data.shape_keys:
             report_fn({'WARNING'}, f"No shape keys found for processing in mesh '{mesh_obj.name}'")
             write_log(f"No shape keys found for processing in mesh '{mesh_obj.name}'")
             return False
         
+        # key_blocks は一度だけ取得して使い回す
+        kbs = mesh_obj.data.shape_keys.key_blocks
+        
         # 'CatHutBasicPose'シェイプキーと'ベース'シェイプキーを取得
-        base_change_key = mesh_obj.data.shape_keys.key_blocks.get('CatHutBasicPose')
-        if not base_change_key:
+        # （変形量が渡された場合は一時シェイプキーは存在しない）
+        base_change_key = kbs.get('CatHutBasicPose') if delta is None else None
+        if delta is None and not base_change_key:
             report_fn({'WARNING'}, f"Could not find 'CatHutBasicPose' shape key in mesh '{mesh_obj.name}'")
             write_log(f"Could not find 'CatHutBasicPose' shape key in mesh '{mesh_obj.name}'")
             return False
         
         # 通常、最初のシェイプキーがBasis
-        basis_key = mesh_obj.data.shape_keys.key_blocks[0]
-        basis_key_name = basis_key.name  # 元のベース名を保存
-        
-        # CatHutBasicPoseを値1.0に設定
-        base_change_key.value = 1.0
-        
-        # シェイプキーのリスト作成（Basisとbase_change_key以外）
-        shape_keys_list = [
-            key for key in mesh_obj.data.shape_keys.key_blocks 
-            if key != base_change_key and key != basis_key
-        ]
-        
-        write_log(f"Found {len(shape_keys_list)} shape keys to process in mesh '{mesh_obj.name}'")
-        
-        # 各シェイプキーを処理
-        for shape_key in list(shape_keys_list):  # リストのコピーでループ
-            # 元々のシェイプキーの値を保存
-            original_name = shape_key.name
-            original_value = shape_key.value
-            write_log(f"Processing shape key: {original_name} in mesh '{mesh_obj.name}'")
-            
-            # 処理対象のシェイプキーを1.0に
-            shape_key.value = 1.0
-            
-            # 現在の混合形状で一時キーを作成
-            mesh_obj.shape_key_add(name="CatHutTemp", from_mix=True)
-            temp_key = mesh_obj.data.shape_keys.key_blocks["CatHutTemp"]
-            
-            # 元のシェイプキーのインデックスを取得して削除
-            idx = mesh_obj.data.shape_keys.key_blocks.find(original_name)
-            if idx != -1:
-                mesh_obj.active_shape_key_index = idx
-                bpy.ops.object.shape_key_remove()
-            
-            # 一時キーを元の名前にリネームし、値を復元
-            temp_key.name = original_name
-            temp_key.value = original_value
-            
-            write_log(f"Processed shape key: {original_name} in mesh '{mesh_obj.name}'")
-        
-        # すべてのシェイプキーをゼロにリセット
-        for k in mesh_obj.data.shape_keys.key_blocks:
-            k.value = 0.0
-        
-        # 元のシェイプキーのベースを削除し、CatHutBasicPoseをベースとする
-        # CatHutBasicPoseを値1.0に設定
-        base_change_key.value = 1.0
-        
-        # CatHutBasicPoseを最上位に移動
-        catbasis_idx = mesh_obj.data.shape_keys.key_blocks.find('CatHutBasicPose')
-        mesh_obj.active_shape_key_index = catbasis_idx
-        bpy.ops.object.shape_key_move(type='TOP')
-        
-        # 元のBasisを削除
-        basis_idx = mesh_obj.data.shape_keys.key_blocks.find(basis_key_name)
-        if basis_idx != -1:
-            mesh_obj.active_shape_key_index = basis_idx
-            bpy.ops.object.shape_key_remove()
-        
-        # CatHutBasicPoseを元のベース名にリネーム
-        mesh_obj.data.shape_keys.key_blocks[0].name = basis_key_name
-        write_log(f"Renamed CatHutBasicPose to {basis_key_name} and set as basis for mesh '{mesh_obj.name}'")
+        basis_key = kbs[0]
+        basis_key_name = basis_key.name
+        
+        # 処理中はメッシュのビューポート評価を止め、最後に一度だけ再評価させる
+        with suspend_viewport_evaluation(mesh_obj):
+            coord_len = len(mesh_obj.data.vertices) * 3
+            basis_co = _work_array(buf, 0, coord_len)
+            basis_key.data.foreach_get("co", basis_co)
+            if delta is None:
+                # ポーズ適用による変形量（CatHutBasicPose - Basis）を頂点座標配列で求める
+                delta = _work_array(buf, 2, coord_len)
+                base_change_key.data.foreach_get("co", delta)
+                delta -= basis_co
+        
+            # 処理対象のシェイプキー名（Basisとbase_change_key以外）
+            # シェイプキー名は Key 内で一意なので、RNA 同士の比較ではなく名前で除外する
+            skip = {basis_key_name}
+            if base_change_key:
+                skip.add(base_change_key.name)
+            # 変形量がゼロ（動いたボーンの影響なし）なら座標の書き換えは不要
+            if delta.any():
+                shape_key_names = [kb.name for kb in kbs if kb.name not in skip]
+            else:
+                shape_key_names = []
+        
+            write_log(f"Found {len(shape_key_names)} shape keys to process in mesh '{mesh_obj.name}'")
+        
+            # 各シェイプキーに同じ変形量を加算（一時キーの作成・削除は行わない）
+            if _apply_delta_stacked is not None and coord_len >= _NUMBA_MIN_VERTS * 3 and shape_key_names:
+                # 大規模メッシュ: _NUMBA_CHUNK_ROWS 個ずつ作業用バッファにまとめて並列カーネルで加算
+                block = _work_rows(buf, 3, _NUMBA_CHUNK_ROWS, coord_len)
+                for start in range(0, len(shape_key_names), _NUMBA_CHUNK_ROWS):
+                    chunk_names = shape_key_names[start:start + _NUMBA_CHUNK_ROWS]
+                    rows = block[:len(chunk_names)]
+                    for row, name in zip(rows, chunk_names):
+                        kbs[name].data.foreach_get("co", row)
+                    _apply_delta_stacked(rows, delta)
+                    for row, name in zip(rows, chunk_names):
+                        kbs[name].data.foreach_set("co", row)
+                        write_log("Processed shape key: %s in mesh '%s'", name, mesh_obj.name)
+            else:
+                co = _work_array(buf, 1, coord_len)
+                for name in shape_key_names:
+                    shape_key_data = kbs[name].data
+                    shape_key_data.foreach_get("co", co)
+                    co += delta
+                    shape_key_data.foreach_set("co", co)
+                    write_log("Processed shape key: %s in mesh '%s'", name, mesh_obj.name)
+        
+            # すべてのシェイプキーをゼロにリセット（foreach_set で一度に書き込む）
+            kbs.foreach_set("value", np.zeros(len(kbs), dtype=np.float32))
+        
+            # 変形後の形状をBasis（参照キー）とメッシュ頂点に書き込み、
+            # CatHutBasicPoseがあれば削除する（bpy.ops による移動・削除は使わない）
+            basis_co += delta
+            basis_key.data.foreach_set("co", basis_co)
+            mesh_obj.data.vertices.foreach_set("co", basis_co)
+            if base_change_key:
+                mesh_obj.shape_key_remove(base_change_key)
+            mesh_obj.data.update()
+        write_log(f"Applied posed shape to {basis_key_name} and set as basis for mesh '{mesh_obj.name}'")
         
         return True
         
@@ -301,13 +404,15 @@ def process_shape_keys_after_rest_pose(mesh_obj, report_fn):
         report_fn({'ERROR'}, f"Shape key processing after rest pose failed: {e}")
         return False
 
-def process_without_shape_keys(arm_obj, mesh_obj, report_fn):
+def process_without_shape_keys(arm_obj, mesh_obj, report_fn, depsgraph=None, deforming_bones=None):
     """シェイプキーがない場合の処理
     
     Parameters:
         arm_obj: アーマチュアオブジェクト
         mesh_obj: メッシュオブジェクト
         report_fn: レポート関数
+        depsgraph: ボーン回転後の評価済み depsgraph（省略時はモディファイア適用で処理）
+        deforming_bones: 現在のポーズで動くボーン名の集合（省略時は常に評価する）
     
     Returns:
         bool: 成功したかどうか
@@ -315,13 +420,12 @@ def process_without_shape_keys(arm_obj, mesh_obj, report_fn):
     try:
         write_log(f"Processing mesh '{mesh_obj.name}' without shape keys...")
         
-        # オブジェクトモードに切り替え
-        bpy.ops.object.mode_set(mode='OBJECT')
-        
-        # メッシュオブジェクトをアクティブに
-        bpy.context.view_layer.objects.active = mesh_obj
-        mesh_obj.select_set(True)
-        arm_obj.select_set(False)
+        # 動いたボーンの影響を受けないメッシュは頂点座標が変わらないので何もしない
+        arm_modifier = _find_armature_modifier(mesh_obj, arm_obj)
+        if (deforming_bones is not None and arm_modifier is not None
+                and not is_deformed_by_bones(mesh_obj, arm_modifier, deforming_bones)):
+            write_log(f"Mesh '{mesh_obj.name}' is not affected by posed bones, skipped")
+            return True
         
         # 重要: メッシュデータがsingle-userかチェックして、そうでなければsingle-userに変換
         if mesh_obj.data.users > 1:
@@ -332,9 +436,19 @@ def process_without_shape_keys(arm_obj, mesh_obj, report_fn):
             mesh_obj.data.name = tempname
             write_log(f"Mesh data for '{mesh_obj.name}' is now single-user")
         
+        # 評価済みメッシュの変形後座標をそのまま頂点に書き込む（モディファイアは残す）
+        if depsgraph is not None and arm_modifier is not None:
+            coords = get_armature_deformed_coords(mesh_obj, arm_modifier, depsgraph)
+            if coords is not None:
+                mesh_obj.data.vertices.foreach_set("co", coords)
+                mesh_obj.data.update()
+                write_log(f"Baked armature deformation into mesh '{mesh_obj.name}'")
+                return True
+            write_log(f"Evaluated mesh unavailable for '{mesh_obj.name}', falling back to modifier apply")
+        
         # 現在のアーマチュアモディファイアを複製して適用
         write_log(f"Adding and applying new armature modifier to mesh '{mesh_obj.name}'...")
-        if not apply_new_armature_modifier(mesh_obj, arm_obj, report_fn):
+        if not apply_new_armature_modifier(mesh_obj, arm_obj, report_fn, deforming_bones):
             report_fn({'ERROR'}, f"Failed to apply armature modifier to mesh '{mesh_obj.name}'")
             return False
         
@@ -346,6 +460,117 @@ def process_without_shape_keys(arm_obj, mesh_obj, report_fn):
         report_fn({'ERROR'}, f"Process failed for mesh '{mesh_obj.name}': {e}")
         return False
 
+def _run_rest_pose_pipeline(context, arm_obj, related_meshes, report_fn):
+    """関連メッシュを保護しながら現在のポーズをレストポーズとして適用する
+    
+    ConvertPose / SetRestPose 共通の処理（メッシュ分類、シェイプキー保存、
+    シェイプキーなしメッシュの処理、レストポーズ適用、シェイプキー再計算）
+    
+    Parameters:
+        context: オペレーターのコンテキスト
+        arm_obj: アーマチュアオブジェクト
+        related_meshes: arm_obj に関連するメッシュオブジェクトのリスト
+        report_fn: レポート関数
+    
+    Returns:
+        tuple: (処理に成功したメッシュ数, 対象メッシュ数)
+    """
+    # シェイプキーを持つメッシュとシェイプキーを持たないメッシュを分類
+    meshes_with_shape_keys = []
+    meshes_without_shape_keys = []
+
+    for mesh_obj in related_meshes:
+        shape_keys = mesh_obj.data.shape_keys
+        has_shape_keys = shape_keys is not None and len(shape_keys.key_blocks) > 0
+        if has_shape_keys:
+            meshes_with_shape_keys.append(mesh_obj)
+        else:
+            meshes_without_shape_keys.append(mesh_obj)
+
+    write_log(f"Found {len(meshes_with_shape_keys)} meshes with shape keys")
+    write_log(f"Found {len(meshes_without_shape_keys)} meshes without shape keys")
+
+    # 同じメッシュデータを共有するオブジェクト（リンク複製）はシェイプキーも共有するため、
+    # データごとに先頭のオブジェクトだけで処理する（変形量を二重に加算しない）
+    # {メッシュデータ名: そのデータを使うオブジェクトのリスト}
+    shape_key_users = {}
+    for mesh_obj in meshes_with_shape_keys:
+        shape_key_users.setdefault(mesh_obj.data.name, []).append(mesh_obj)
+
+    # メッシュ処理の前に一度だけオブジェクトモードへ切り替える
+    # （各メッシュの処理内ではモードを切り替えない）
+    if context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    # ステップ1: 全メッシュに対して現在の変形を保存（シェイプキーあり）
+    # ポーズ評価済みの depsgraph は全メッシュで共有する
+    # （ボーン回転後の最初の評価。ここでポーズ行列もオリジナル側へ反映される）
+    depsgraph = context.evaluated_depsgraph_get()
+    # 実際に動いたボーンを一度だけ求め、影響を受けないメッシュの評価を省く
+    # （pose_bone.matrix を読むので必ず evaluated_depsgraph_get() の後に行う）
+    deforming_bones = get_deforming_bone_names(arm_obj)
+    # 変形量はメッシュデータ名ごとにメモリ上に保持し、一時シェイプキーは評価できない場合のみ作る
+    pose_deltas = {}
+    # 座標の作業用配列は最大頂点数で一度だけ確保し、全メッシュで使い回す
+    # （行0: Basis, 行1: 各シェイプキー, 行2: CatHutBasicPose からの変形量,
+    #   行3以降: Numba カーネル用のシェイプキー _NUMBA_CHUNK_ROWS 個分。大規模メッシュがある時のみ）
+    max_coord_len = max((len(m.data.vertices) * 3 for m in meshes_with_shape_keys), default=0)
+    buf_rows = 3
+    if _apply_delta_stacked is not None and max_coord_len >= _NUMBA_MIN_VERTS * 3:
+        buf_rows += _NUMBA_CHUNK_ROWS
+    work_buf = np.empty((buf_rows, max_coord_len), dtype=np.float32)
+    successful_shape_key_saves = 0
+    for users in shape_key_users.values():
+        mesh_obj = users[0]
+        if len(users) > 1:
+            write_log(f"Mesh data '{mesh_obj.data.name}' is shared by {len(users)} objects, processing it once")
+        with _mesh_override(context, mesh_obj):
+            saved = save_mesh_as_shape_key(
+                arm_obj, mesh_obj, report_fn, depsgraph, deforming_bones, pose_deltas, work_buf)
+        if saved:
+            successful_shape_key_saves += len(users)
+        else:
+            report_fn({'WARNING'}, f"Failed to save shape key for mesh '{mesh_obj.name}'")
+
+    # ステップ2: シェイプキーのないメッシュを処理
+    successful_no_shape_keys = 0
+    for mesh_obj in meshes_without_shape_keys:
+        with _mesh_override(context, mesh_obj):
+            processed = process_without_shape_keys(arm_obj, mesh_obj, report_fn, depsgraph, deforming_bones)
+        if processed:
+            successful_no_shape_keys += 1
+        else:
+            report_fn({'WARNING'}, f"Failed to process mesh '{mesh_obj.name}' without shape keys")
+
+    # ステップ3: レストポーズを適用（すべてのメッシュの処理後に1回だけ実行）
+    write_log("All meshes pre-processed, applying current pose as rest pose...")
+    bpy.context.view_layer.objects.active = arm_obj
+    arm_obj.select_set(True)
+    for mesh_obj in related_meshes:
+        mesh_obj.select_set(False)
+
+    apply_as_rest_pose(arm_obj)
+
+    # ステップ4: 各シェイプキーを処理（シェイプキーあり）
+    successful_shape_key_processing = 0
+    for mesh_name, users in shape_key_users.items():
+        mesh_obj = users[0]
+        if process_shape_keys_after_rest_pose(mesh_obj, report_fn, pose_deltas.get(mesh_name), work_buf):
+            successful_shape_key_processing += len(users)
+        else:
+            report_fn({'WARNING'}, f"Failed to process shape keys after rest pose for mesh '{mesh_obj.name}'")
+
+    # オブジェクトモードに戻す（apply_as_rest_pose 後は既にオブジェクトモード）
+    if context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+        write_log("Switched back to OBJECT mode")
+
+    # 最終更新を確実に反映
+    bpy.context.view_layer.update()
+    write_log("Final view layer update performed")
+    
+    return successful_shape_key_processing + successful_no_shape_keys, len(related_meshes)
+
 class POSECONV_OT_ConvertPose(Operator):
     bl_idname = "poseconv.convert_pose"
     bl_label = "Convert Pose (Safe for Shape Keys)"
@@ -353,141 +578,92 @@ class POSECONV_OT_ConvertPose(Operator):
     bl_options = {'REGISTER', 'UNDO'} 
 
     def execute(self, context):
-        write_log("Starting pose conversion...")
-        
-        # アーマチュアオブジェクトの取得
-        arm_obj = context.object
-        props = context.scene.pose_converter_props
-
-        # アーマチュアの検証
-        if not arm_obj or arm_obj.type != 'ARMATURE':
-            self.report({'WARNING'}, "Please select a valid Armature object.")
-            write_log("Pose conversion failed: No valid armature selected")
-            return {'CANCELLED'}
-
-        # 関連メッシュオブジェクトの検索
-        related_meshes = find_related_mesh_objects(arm_obj)
-        if not related_meshes:
-            self.report({'WARNING'}, "No meshes found with Armature modifier targeting the selected armature.")
-            write_log("Pose conversion failed: No related meshes found")
-            return {'CANCELLED'}
-
-        # ボーン名の検証と処理用マッピングの作成
-        bone_mapping = {
-            "shoulder_l": props.shoulder_l,
-            "shoulder_r": props.shoulder_r,
-            "upperarm_l": props.upperarm_l,
-            "upperarm_r": props.upperarm_r
-        }
-        
-        # ボーン検証
-        valid_bones = [
-            name for name in bone_mapping.values() 
-            if name and name in arm_obj.pose.bones
-        ]
-        
-        if not valid_bones:
-            self.report({'WARNING'}, "No valid bones specified. Please run 'Detect Bones' first or manually specify bones.")
-            write_log("Pose conversion failed: No valid bones specified")
-            return {'CANCELLED'}
-        
-        # 変換モードと回転角度の取得
-        shoulder_angle = props.shoulder_rotation_angle
-        upperarm_angle = props.upperarm_rotation_angle
-        
-        if props.conversion_mode == 'A_TO_T':
-            shoulder_angle = -shoulder_angle  # A→T変換の場合は角度を反転
-            upperarm_angle = -upperarm_angle  # A→T変換の場合は角度を反転
-        
-        write_log(f"Conversion mode: {props.conversion_mode}")
-        write_log(f"Shoulder rotation angle: {shoulder_angle}")
-        write_log(f"UpperArm rotation angle: {upperarm_angle}")
-        write_log(f"Valid bones: {valid_bones}")
-        write_log(f"Processing {len(related_meshes)} related meshes")
-
-        try:
-            # 1. ポーズモードに切り替え
-            bpy.ops.object.mode_set(mode='POSE')
-            write_log("Switched to POSE mode")
+        with log_batch():
+            write_log("Starting pose conversion...")
             
-            # 2. 各ボーンの回転処理
-            if not rotate_bones_for_pose_conversion(arm_obj, bone_mapping, shoulder_angle, upperarm_angle):
-                self.report({'ERROR'}, "Bone rotation failed.")
+            # アーマチュアオブジェクトの取得
+            arm_obj = context.object
+            props = context.scene.pose_converter_props
+
+            # アーマチュアの検証
+            if not arm_obj or arm_obj.type != 'ARMATURE':
+                self.report({'WARNING'}, "Please select a valid Armature object.")
+                write_log("Pose conversion failed: No valid armature selected")
                 return {'CANCELLED'}
+
+            # 関連メッシュオブジェクトの検索
+            related_meshes = find_related_mesh_objects(arm_obj)
+            if not related_meshes:
+                self.report({'WARNING'}, "No meshes found with Armature modifier targeting the selected armature.")
+                write_log("Pose conversion failed: No related meshes found")
+                return {'CANCELLED'}
+
+            # ボーン名の検証と処理用マッピングの作成
+            bone_mapping = {
+                "shoulder_l": props.shoulder_l,
+                "shoulder_r": props.shoulder_r,
+                "upperarm_l": props.upperarm_l,
+                "upperarm_r": props.upperarm_r
+            }
             
-            # シェイプキーを持つメッシュとシェイプキーを持たないメッシュを分類
-            meshes_with_shape_keys = []
-            meshes_without_shape_keys = []
-            
-            for mesh_obj in related_meshes:
-                has_shape_keys = mesh_obj.data.shape_keys is not None and len(mesh_obj.data.shape_keys.key_blocks) > 0
-                if has_shape_keys:
-                    meshes_with_shape_keys.append(mesh_obj)
-                else:
-                    meshes_without_shape_keys.append(mesh_obj)
-            
-            write_log(f"Found {len(meshes_with_shape_keys)} meshes with shape keys")
-            write_log(f"Found {len(meshes_without_shape_keys)} meshes without shape keys")
-            
-            # ステップ1: 全メッシュに対して現在の変形を保存（シェイプキーあり）
-            successful_shape_key_saves = 0
-            for mesh_obj in meshes_with_shape_keys:
-                if save_mesh_as_shape_key(arm_obj, mesh_obj, self.report):
-                    successful_shape_key_saves += 1
-                else:
-                    self.report({'WARNING'}, f"Failed to save shape key for mesh '{mesh_obj.name}'")
+            # ボーン検証
+            valid_bones = [
+                name for name in bone_mapping.values() 
+                if name and name in arm_obj.pose.bones
+            ]
             
-            # ステップ2: シェイプキーのないメッシュを処理
-            successful_no_shape_keys = 0
-            for mesh_obj in meshes_without_shape_keys:
-                if process_without_shape_keys(arm_obj, mesh_obj, self.report):
-                    successful_no_shape_keys += 1
-                else:
-                    self.report({'WARNING'}, f"Failed to process mesh '{mesh_obj.name}' without shape keys")
+            if not valid_bones:
+                self.report({'WARNING'}, "No valid bones specified. Please run 'Detect Bones' first or manually specify bones.")
+                write_log("Pose conversion failed: No valid bones specified")
+                return {'CANCELLED'}
             
-            # ステップ3: レストポーズを適用（すべてのメッシュの処理後に1回だけ実行）
-            write_log("All meshes pre-processed, applying current pose as rest pose...")
-            bpy.context.view_layer.objects.active = arm_obj
-            arm_obj.select_set(True)
-            for mesh_obj in related_meshes:
-                mesh_obj.select_set(False)
+            # 変換モードと回転角度の取得
+            shoulder_angle = props.shoulder_rotation_angle
+            upperarm_angle = props.upperarm_rotation_angle
             
-            apply_as_rest_pose(arm_obj)
+            if props.conversion_mode == 'A_TO_T':
+                shoulder_angle = -shoulder_angle  # A→T変換の場合は角度を反転
+                upperarm_angle = -upperarm_angle  # A→T変換の場合は角度を反転
             
-            # ステップ4: 各シェイプキーを処理（シェイプキーあり）
-            successful_shape_key_processing = 0
-            for mesh_obj in meshes_with_shape_keys:
-                if process_shape_keys_after_rest_pose(mesh_obj, self.report):
-                    successful_shape_key_processing += 1
+            write_log(f"Conversion mode: {props.conversion_mode}")
+            write_log(f"Shoulder rotation angle: {shoulder_angle}")
+            write_log(f"UpperArm rotation angle: {upperarm_angle}")
+            write_log(f"Valid bones: {valid_bones}")
+            write_log(f"Processing {len(related_meshes)} related meshes")
+
+            # 終了時に復元する選択状態を記録
+            orig_active = context.view_layer.objects.active
+            orig_selected = list(context.selected_objects)
+
+            try:
+                # 1. ポーズモードに切り替え
+                bpy.ops.object.mode_set(mode='POSE')
+                write_log("Switched to POSE mode")
+                
+                # 2. 各ボーンの回転処理
+                if not rotate_bones_for_pose_conversion(arm_obj, bone_mapping, shoulder_angle, upperarm_angle):
+                    self.report({'ERROR'}, "Bone rotation failed.")
+                    return {'CANCELLED'}
+                
+                total_success, total_meshes = _run_rest_pose_pipeline(
+                    context, arm_obj, related_meshes, self.report)
+                
+                if total_success < total_meshes:
+                    self.report({'WARNING'}, 
+                        f"Pose conversion completed with issues: {total_success}/{total_meshes} meshes processed successfully.")
                 else:
-                    self.report({'WARNING'}, f"Failed to process shape keys after rest pose for mesh '{mesh_obj.name}'")
-            
-            # オブジェクトモードに戻す
-            bpy.ops.object.mode_set(mode='OBJECT')
-            write_log("Switched back to OBJECT mode")
-            
-            # 最終更新を確実に反映
-            bpy.context.view_layer.update()
-            write_log("Final view layer update performed")
-            
-            # 処理結果をレポート
-            total_success = successful_shape_key_processing + successful_no_shape_keys
-            total_meshes = len(related_meshes)
-            
-            if total_success < total_meshes:
-                self.report({'WARNING'}, 
-                    f"Pose conversion completed with issues: {total_success}/{total_meshes} meshes processed successfully.")
-            else:
-                self.report({'INFO'}, 
-                    f"Pose conversion ({props.conversion_mode}) completed: All {total_meshes} meshes processed successfully.")
+                    self.report({'INFO'}, 
+                        f"Pose conversion ({props.conversion_mode}) completed: All {total_meshes} meshes processed successfully.")
 
-        except Exception as e:
-            self.report({'ERROR'}, f"Pose conversion failed: {e}")
-            write_log(f"ERROR: Pose conversion failed: {e}")
-            return {'CANCELLED'}
+            except Exception as e:
+                self.report({'ERROR'}, f"Pose conversion failed: {e}")
+                write_log(f"ERROR: Pose conversion failed: {e}")
+                return {'CANCELLED'}
+            finally:
+                _restore_selection(context, orig_active, orig_selected)
 
-        write_log("Pose conversion completed")
-        return {'FINISHED'}
+            write_log("Pose conversion completed")
+            return {'FINISHED'}
     
 class POSECONV_OT_SetRestPose(Operator):
     bl_idname = "poseconv.set_rest_pose"
@@ -496,104 +672,52 @@ class POSECONV_OT_SetRestPose(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        write_log("Starting set rest pose operation...")
-        
-        # アーマチュアオブジェクトの取得
-        arm_obj = context.object
-        
-        # アーマチュアの検証
-        if not arm_obj or arm_obj.type != 'ARMATURE':
-            self.report({'WARNING'}, "Please select a valid Armature object.")
-            write_log("Set rest pose failed: No valid armature selected")
-            return {'CANCELLED'}
-
-        # 関連メッシュオブジェクトの検索
-        related_meshes = find_related_mesh_objects(arm_obj)
-        if not related_meshes:
-            self.report({'WARNING'}, "No meshes found with Armature modifier targeting the selected armature.")
-            write_log("Set rest pose failed: No related meshes found")
-            return {'CANCELLED'}
-
-        try:
-            # シェイプキーを持つメッシュとシェイプキーを持たないメッシュを分類
-            meshes_with_shape_keys = []
-            meshes_without_shape_keys = []
-            
-            for mesh_obj in related_meshes:
-                has_shape_keys = mesh_obj.data.shape_keys is not None and len(mesh_obj.data.shape_keys.key_blocks) > 0
-                if has_shape_keys:
-                    meshes_with_shape_keys.append(mesh_obj)
-                else:
-                    meshes_without_shape_keys.append(mesh_obj)
-            
-            write_log(f"Found {len(meshes_with_shape_keys)} meshes with shape keys")
-            write_log(f"Found {len(meshes_without_shape_keys)} meshes without shape keys")
-            
-            # ステップ1: 全メッシュに対して現在の変形を保存（シェイプキーあり）
-            successful_shape_key_saves = 0
-            for mesh_obj in meshes_with_shape_keys:
-                if save_mesh_as_shape_key(arm_obj, mesh_obj, self.report):
-                    successful_shape_key_saves += 1
-                else:
-                    self.report({'WARNING'}, f"Failed to save shape key for mesh '{mesh_obj.name}'")
-            
-            # ステップ2: シェイプキーのないメッシュを処理
-            successful_no_shape_keys = 0
-            for mesh_obj in meshes_without_shape_keys:
-                if process_without_shape_keys(arm_obj, mesh_obj, self.report):
-                    successful_no_shape_keys += 1
-                else:
-                    self.report({'WARNING'}, f"Failed to process mesh '{mesh_obj.name}' without shape keys")
-            
-            # ステップ3: レストポーズを適用（すべてのメッシュの処理後に1回だけ実行）
-            write_log("All meshes pre-processed, applying current pose as rest pose...")
-            bpy.context.view_layer.objects.active = arm_obj
-            arm_obj.select_set(True)
-            for mesh_obj in related_meshes:
-                mesh_obj.select_set(False)
-            
-            apply_as_rest_pose(arm_obj)
-            
-            # ステップ4: 各シェイプキーを処理（シェイプキーあり）
-            successful_shape_key_processing = 0
-            for mesh_obj in meshes_with_shape_keys:
-                if process_shape_keys_after_rest_pose(mesh_obj, self.report):
-                    successful_shape_key_processing += 1
-                else:
-                    self.report({'WARNING'}, f"Failed to process shape keys after rest pose for mesh '{mesh_obj.name}'")
-            
-            # オブジェクトモードに戻す
-            bpy.ops.object.mode_set(mode='OBJECT')
-            write_log("Switched back to OBJECT mode")
+        with log_batch():
+            write_log("Starting set rest pose operation...")
             
-            # 最終更新を確実に反映
-            bpy.context.view_layer.update()
-            write_log("Final view layer update performed")
+            # アーマチュアオブジェクトの取得
+            arm_obj = context.object
             
-            # 処理結果をレポート
-            total_success = successful_shape_key_processing + successful_no_shape_keys
-            total_meshes = len(related_meshes)
-            
-            if total_success < total_meshes:
-                self.report({'WARNING'}, 
-                    f"Rest pose set with issues: {total_success}/{total_meshes} meshes processed successfully.")
-            else:
-                self.report({'INFO'}, 
-                    f"Rest pose set: All {total_meshes} meshes updated successfully.")
+            # アーマチュアの検証
+            if not arm_obj or arm_obj.type != 'ARMATURE':
+                self.report({'WARNING'}, "Please select a valid Armature object.")
+                write_log("Set rest pose failed: No valid armature selected")
+                return {'CANCELLED'}
+
+            # 関連メッシュオブジェクトの検索
+            related_meshes = find_related_mesh_objects(arm_obj)
+            if not related_meshes:
+                self.report({'WARNING'}, "No meshes found with Armature modifier targeting the selected armature.")
+                write_log("Set rest pose failed: No related meshes found")
+                return {'CANCELLED'}
 
-        except Exception as e:
-            self.report({'ERROR'}, f"Set rest pose failed: {e}")
-            write_log(f"ERROR: Set rest pose failed: {e}")
-            return {'CANCELLED'}
+            # 終了時に復元する選択状態を記録
+            orig_active = context.view_layer.objects.active
+            orig_selected = list(context.selected_objects)
 
-        write_log("Set rest pose completed successfully")
-        return {'FINISHED'}
+            try:
+                total_success, total_meshes = _run_rest_pose_pipeline(
+                    context, arm_obj, related_meshes, self.report)
+                
+                if total_success < total_meshes:
+                    self.report({'WARNING'}, 
+                        f"Rest pose set with issues: {total_success}/{total_meshes} meshes processed successfully.")
+                else:
+                    self.report({'INFO'}, 
+                        f"Rest pose set: All {total_meshes} meshes updated successfully.")
+
+            except Exception as e:
+                self.report({'ERROR'}, f"Set rest pose failed: {e}")
+                write_log(f"ERROR: Set rest pose failed: {e}")
+                return {'CANCELLED'}
+            finally:
+                _restore_selection(context, orig_active, orig_selected)
 
+            write_log("Set rest pose completed successfully")
+            return {'FINISHED'}
 
-def register():
-    bpy.utils.register_class(POSECONV_OT_ConvertPose)
-    bpy.utils.register_class(POSECONV_OT_SetRestPose)
 
-def unregister():
-    bpy.utils.unregister_class(POSECONV_OT_SetRestPose)
-    bpy.utils.unregister_class(POSECONV_OT_ConvertPose)
\ No newline at end of file
+register, unregister = bpy.utils.register_classes_factory((
+    POSECONV_OT_ConvertPose,
+    POSECONV_OT_SetRestPose,
+))
\ No newline at end of file
@@ -1,20 +1,57 @@
 import bpy
-from bpy.props import PointerProperty, EnumProperty, FloatProperty, StringProperty
+from bpy.props import PointerProperty, EnumProperty, FloatProperty, StringProperty, BoolProperty
 from bpy.types import Panel, PropertyGroup
-from .utils import find_related_mesh_objects, write_log
+from .utils import find_related_mesh_objects_cached, mesh_has_shape_keys_cached, write_log
 
 # ────────────────────────────────────────────────────────────────
 #  AddonPreferences と同期するための update コールバック
 # ────────────────────────────────────────────────────────────────
 ADDON_NAME = __package__.split('.')[0]  # "TA_PoseConverter"
 
+# ドラッグ中は値が毎フレーム変わるため、プリファレンスへの書き込みはまとめて行う
+# {プロパティ名: 最新値} を貯め、タイマーで一度だけ書き込む
+_PREF_SYNC_DELAY = 0.1
+_pending_sync = {}
+
+def flush_pending_pref_sync():
+    """保留中の値をまとめてプリファレンスへ書き込む（タイマーからも呼ばれる）"""
+    if not _pending_sync:
+        return None
+    # AddonPreferences は保持せず毎回引く（アドオンの再有効化やプリファレンスの
+    # 再読込で参照が無効になるため）。アドオンが無効化されていれば書き込まない
+    addon = bpy.context.preferences.addons.get(ADDON_NAME)
+    if addon is not None:
+        prefs = addon.preferences
+        for attr, value in _pending_sync.items():
+            if getattr(prefs, attr) != value:
+                setattr(prefs, attr, value)
+    _pending_sync.clear()
+    return None  # タイマーを繰り返さない
+
+def cancel_pending_pref_sync():
+    """保留中の同期タイマーを止め、残っている値を書き込む（アドオン解除時）"""
+    if bpy.app.timers.is_registered(flush_pending_pref_sync):
+        bpy.app.timers.unregister(flush_pending_pref_sync)
+    flush_pending_pref_sync()
+
+def _queue_pref_sync(attr, value):
+    _pending_sync[attr] = value
+    if not bpy.app.timers.is_registered(flush_pending_pref_sync):
+        bpy.app.timers.register(flush_pending_pref_sync, first_interval=_PREF_SYNC_DELAY)
+
+def _tag_redraw_area(context):
+    """値を変更したエリアだけを再描画対象にする（全エリアの再描画は行わない）"""
+    area = context.area
+    if area is not None:
+        area.tag_redraw()
+
 def _sync_to_pref_shoulder(self, context):
-    prefs = context.preferences.addons[ADDON_NAME].preferences
-    prefs.shoulder_rotation_angle = self.shoulder_rotation_angle
+    _queue_pref_sync("shoulder_rotation_angle", self.shoulder_rotation_angle)
+    _tag_redraw_area(context)
 
 def _sync_to_pref_upper(self, context):
-    prefs = context.preferences.addons[ADDON_NAME].preferences
-    prefs.upperarm_rotation_angle = self.upperarm_rotation_angle
+    _queue_pref_sync("upperarm_rotation_angle", self.upperarm_rotation_angle)
+    _tag_redraw_area(context)
 
 
 class PoseConverterProperties(PropertyGroup):
@@ -67,6 +104,12 @@ class PoseConverterProperties(PropertyGroup):
         description="Right upper arm bone"
     )
 
+    show_related_meshes: BoolProperty(
+        name="Show Related Meshes",
+        description="Show the list of meshes deformed by the armature",
+        default=True
+    )
+
     def draw(self, context):
         layout = self.layout
         layout.label(text="デフォルトの回転角度")
@@ -74,6 +117,15 @@ class PoseConverterProperties(PropertyGroup):
         layout.prop(self, "upperarm_rotation_angle")
 
 
+# ボーンマッピング欄 (プロパティ名, 表示名)
+_BONE_SLOTS = (
+    ("shoulder_l", "Shoulder L"),
+    ("shoulder_r", "Shoulder R"),
+    ("upperarm_l", "UpperArm L"),
+    ("upperarm_r", "UpperArm R"),
+)
+
+
 class PoseToolPanel(Panel):
     bl_label = "T2A PoseConverter"
     bl_idname = "VIEW3D_PT_pose_converter"
@@ -81,7 +133,14 @@ class PoseToolPanel(Panel):
     bl_region_type = 'UI'
     bl_category = 'CatHut'
 
+    # これより狭いリージョンは実質的に見えていないので描画しない
+    _MIN_REGION_WIDTH = 50
+
     def draw(self, context):
+        region = context.region
+        if region is None or region.width < self._MIN_REGION_WIDTH:
+            return
+        
         layout = self.layout
         props = context.scene.pose_converter_props
         
@@ -98,27 +157,34 @@ class PoseToolPanel(Panel):
         else:
             row.label(text="No armature selected", icon='ERROR')
         
-        # 関連メッシュの表示
+        # 関連メッシュの表示（折りたたみ可能）
         if armature:
-            related_meshes = find_related_mesh_objects(armature)
-            
             mesh_box = layout.box()
-            mesh_box.label(text=f"Related Meshes ({len(related_meshes)})", icon='OUTLINER_OB_MESH')
+            header = mesh_box.row()
+            header.prop(props, "show_related_meshes", text="", emboss=False,
+                        icon='TRIA_DOWN' if props.show_related_meshes else 'TRIA_RIGHT')
             
-            if related_meshes:
-                mesh_col = mesh_box.column(align=True)
-                for mesh in related_meshes:
-                    mesh_row = mesh_col.row()
-                    mesh_row.label(text=mesh.name, translate=False)
-                    
-                    # シェイプキーの有無を表示
-                    has_shape_keys = mesh.data.shape_keys is not None and len(mesh.data.shape_keys.key_blocks) > 0
-                    if has_shape_keys:
-                        mesh_row.label(text="Has Shape Keys", icon='SHAPEKEY_DATA')
-                    else:
-                        mesh_row.label(text="No Shape Keys", icon='MESH_DATA')
+            if not props.show_related_meshes:
+                # 折りたたみ中はメッシュの検索もシェイプキーの確認も行わない
+                header.label(text="Related Meshes", icon='OUTLINER_OB_MESH')
             else:
-                mesh_box.label(text="No meshes found with Armature modifier", icon='INFO')
+                # 再描画ごとの全オブジェクト走査を避けるためキャッシュを使う
+                related_meshes = find_related_mesh_objects_cached(armature)
+                header.label(text=f"Related Meshes ({len(related_meshes)})", icon='OUTLINER_OB_MESH')
+                
+                if related_meshes:
+                    mesh_col = mesh_box.column(align=True)
+                    for mesh in related_meshes:
+                        mesh_row = mesh_col.row()
+                        mesh_row.label(text=mesh.name, translate=False)
+                        
+                        # シェイプキーの有無を表示
+                        if mesh_has_shape_keys_cached(mesh):
+                            mesh_row.label(text="Has Shape Keys", icon='SHAPEKEY_DATA')
+                        else:
+                            mesh_row.label(text="No Shape Keys", icon='MESH_DATA')
+                else:
+                    mesh_box.label(text="No meshes found with Armature modifier", icon='INFO')
         
         # 回転設定関連要素のボックス - ラベル変更
         pose_conversion_box = layout.box()
@@ -140,16 +206,14 @@ class PoseToolPanel(Panel):
         
         if armature:
             # prop_searchを使ってボーン選択UIを表示
-            bone_col.prop_search(props, "shoulder_l", armature.pose, "bones", text="Shoulder L")
-            bone_col.prop_search(props, "shoulder_r", armature.pose, "bones", text="Shoulder R")
-            bone_col.prop_search(props, "upperarm_l", armature.pose, "bones", text="UpperArm L")
-            bone_col.prop_search(props, "upperarm_r", armature.pose, "bones", text="UpperArm R")
+            # （候補の列挙は検索ポップアップを開いた時だけ行われるので、描画時はそのまま渡す）
+            pose = armature.pose
+            for attr, text in _BONE_SLOTS:
+                bone_col.prop_search(props, attr, pose, "bones", text=text)
         else:
             # アーマチュアが選択されていない場合は通常のプロパティを表示
-            bone_col.prop(props, "shoulder_l")
-            bone_col.prop(props, "shoulder_r")
-            bone_col.prop(props, "upperarm_l")
-            bone_col.prop(props, "upperarm_r")
+            for attr, _text in _BONE_SLOTS:
+                bone_col.prop(props, attr)
             bone_col.label(text="Select an armature for bone picking", icon='INFO')
         
         # 変換実行ボタン - Pose Conversionボックス内に配置
@@ -166,10 +230,7 @@ class PoseToolPanel(Panel):
         rest_box.label(text="Set current pose as rest pose without conversion", icon='INFO')
 
 
-def register():
-    bpy.utils.register_class(PoseConverterProperties)
-    bpy.utils.register_class(PoseToolPanel)
-
-def unregister():
-    bpy.utils.unregister_class(PoseToolPanel)
-    bpy.utils.unregister_class(PoseConverterProperties)
\ No newline at end of file
+register, unregister = bpy.utils.register_classes_factory((
+    PoseConverterProperties,
+    PoseToolPanel,
+))
\ No newline at end of file
@@ -1,18 +1,127 @@
 import bpy
+from bpy.app.handlers import persistent
+import atexit
 import datetime
 import os
+import queue
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# ログファイルのパス（ディレクトリ作成は初回のみ）
+_log_path = None
 
 def get_addon_log_path():
-    temp_dir = bpy.app.tempdir if bpy.app.tempdir else os.path.expanduser("~")
-    log_dir = os.path.join(temp_dir, "pose_converter_logs")
-    os.makedirs(log_dir, exist_ok=True)
-    return os.path.join(log_dir, "pose_converter_log.txt")
+    global _log_path
+    if _log_path is None:
+        temp_dir = bpy.app.tempdir if bpy.app.tempdir else os.path.expanduser("~")
+        log_dir = os.path.join(temp_dir, "pose_converter_logs")
+        os.makedirs(log_dir, exist_ok=True)
+        _log_path = os.path.join(log_dir, "pose_converter_log.txt")
+    return _log_path
+
+# False にするとログ出力を無効化（メッセージの整形も行わない）
+LOG_ENABLED = True
+
+# log_batch() の実行中のみリストになり、書き込みを溜める
+_LOG_BUF = None
+
+# ログの書き込みはバックグラウンドスレッドで行い、呼び出し側はキューに積むだけにする
+# ファイルはメインスレッドで開いてスレッドに渡し、キューが空になった時点でフラッシュする
+_log_queue = None
+_log_thread = None
 
-def write_log(message: str):
-    log_path = get_addon_log_path()
+def _disable_log(error):
+    """ログファイルに書けなくなった時にログ出力を止める（キューに溜め続けないため）"""
+    global LOG_ENABLED
+    LOG_ENABLED = False
+    print(f"T2A PoseConverter: logging disabled ({error})")
+
+def _log_worker(log_queue, fh):
+    try:
+        with fh:
+            while True:
+                lines = log_queue.get()
+                if lines is None:  # close_log() からの終了指示
+                    break
+                fh.writelines(lines)
+                if log_queue.empty():
+                    fh.flush()
+    except OSError as e:
+        # スレッドが終了した後に write_log がキューへ積み続けないよう、ログを無効化する
+        _disable_log(e)
+
+def _write_log_lines(lines):
+    global _log_queue, _log_thread
+    if not LOG_ENABLED:
+        return
+    if _log_thread is None:
+        # bpy へのアクセス（パスの解決）とファイルのオープンはメインスレッドで済ませておく
+        try:
+            fh = open(get_addon_log_path(), "a", encoding="utf-8")
+        except OSError as e:
+            _disable_log(e)
+            return
+        _log_queue = queue.SimpleQueue()
+        _log_thread = threading.Thread(
+            target=_log_worker,
+            args=(_log_queue, fh),
+            name="PoseConverterLog",
+            daemon=True,
+        )
+        _log_thread.start()
+        atexit.register(close_log)
+    _log_queue.put(lines)
+
+def close_log():
+    """書き込み待ちのログを書き出してからログスレッドを終了する（アドオン解除時・終了時）"""
+    global _log_queue, _log_thread
+    if _log_thread is not None:
+        _log_queue.put(None)
+        _log_thread.join()
+        _log_queue = None
+        _log_thread = None
+        atexit.unregister(close_log)
+
+def write_log(message: str, *args):
+    """
+    ログファイルに 1 行追記する
+    
+    args を渡した場合は message % args で整形する。整形はログが有効な時だけ
+    行われるため、行列などの重い値は f-string ではなく引数で渡すこと。
+    """
+    if not LOG_ENABLED:
+        return
+    if args:
+        message = message % args
     timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(f"{timestamp} {message}\n")
+    line = f"{timestamp} {message}\n"
+    if _LOG_BUF is not None:
+        _LOG_BUF.append(line)
+        return
+    _write_log_lines((line,))
+
+@contextmanager
+def log_batch():
+    """
+    ブロック内の write_log をメモリに溜め、終了時にまとめて書き出す
+    
+    オペレーターの execute 内で with log_batch(): として使う。入れ子の場合は
+    最も外側のブロックの終了時に書き出す。
+    デコレーターとしては使わないこと（ラッパーの引数が *args になり、
+    Blender のオペレーター登録時の execute の引数チェックで失敗する）。
+    """
+    global _LOG_BUF
+    if _LOG_BUF is not None:
+        yield
+        return
+    _LOG_BUF = []
+    try:
+        yield
+    finally:
+        lines, _LOG_BUF = _LOG_BUF, None
+        if lines:
+            _write_log_lines(lines)
 
 def print_and_log(report_fn, level: str, message: str):
     report_fn({level}, message)
@@ -21,37 +130,328 @@ def print_and_log(report_fn, level: str, message: str):
 def get_shape_key_values(obj):
     if not obj.data.shape_keys:
         return {}
-    return {kb.name: kb.value for kb in obj.data.shape_keys.key_blocks}
+    # 名前は一度の走査で、値は foreach_get でまとめて読む
+    kbs = obj.data.shape_keys.key_blocks
+    values = np.empty(len(kbs), dtype=np.float32)
+    kbs.foreach_get("value", values)
+    return dict(zip([kb.name for kb in kbs], values.tolist()))
 
 def restore_shape_key_values(obj, key_values):
     if not obj.data.shape_keys:
         return
-    for name, value in key_values.items():
-        if name in obj.data.shape_keys.key_blocks:
-            obj.data.shape_keys.key_blocks[name].value = value
+    # 名前ごとの検索（線形探索）を繰り返さず、現在値の配列を書き換えて一度に書き戻す
+    kbs = obj.data.shape_keys.key_blocks
+    values = np.empty(len(kbs), dtype=np.float32)
+    kbs.foreach_get("value", values)
+    for i, kb in enumerate(kbs):
+        value = key_values.get(kb.name)
+        if value is not None:
+            values[i] = value
+    kbs.foreach_set("value", values)
+    # foreach_set は更新通知を行わないので明示的にタグ付けする
+    obj.data.update_tag()
+
+@contextmanager
+def suspend_viewport_evaluation(obj):
+    """
+    ブロック内でオブジェクトのビューポート評価を止める
+    
+    Object.hide_viewport（オブジェクトプロパティ側。アウトライナーの
+    ObjectBase.hide_viewport ではない）と、アーマチュア以外のモディファイアの
+    show_viewport を一時的にオフにし、終了時（例外時も）に元へ戻す。
+    シェイプキー操作のたびにモディファイアスタックが再評価されるのを防ぐ。
+    """
+    prev_hide = obj.hide_viewport
+    prev_modifiers = [
+        (mod, mod.show_viewport) for mod in obj.modifiers if mod.type != 'ARMATURE'
+    ]
+    obj.hide_viewport = True
+    for mod, _ in prev_modifiers:
+        mod.show_viewport = False
+    try:
+        yield
+    finally:
+        for mod, shown in prev_modifiers:
+            mod.show_viewport = shown
+        obj.hide_viewport = prev_hide
+
+def get_armature_deformed_coords(mesh_obj, arm_modifier, depsgraph):
+    """
+    Basis 形状にアーマチュアモディファイアだけを適用した頂点座標を取得する
+    
+    bpy.ops.object.modifier_apply_as_shapekey と同じ形状を、オペレーターを
+    介さず評価済みメッシュから読み出す。評価中は他のモディファイアを止め、
+    シェイプキーは Basis のみを表示させる（終了時に元へ戻す）。
+    
+    Parameters:
+        mesh_obj: メッシュオブジェクト
+        arm_modifier: 適用するアーマチュアモディファイア
+        depsgraph: 評価に使う depsgraph（context.evaluated_depsgraph_get()）
+        
+    Returns:
+        頂点座標の float32 配列（頂点数 * 3）。非表示で評価されない、
+        頂点数が変わる等で取得できない場合は None
+    """
+    if not mesh_obj.visible_get():
+        return None
+    
+    vert_count = len(mesh_obj.data.vertices)
+    prev_modifiers = [(mod, mod.show_viewport) for mod in mesh_obj.modifiers]
+    prev_show_only = mesh_obj.show_only_shape_key
+    prev_active_index = mesh_obj.active_shape_key_index
+    
+    for mod, _ in prev_modifiers:
+        mod.show_viewport = mod.name == arm_modifier.name
+    if mesh_obj.data.shape_keys:
+        # Basis をピン留めしてシェイプキーのミックスを評価から外す
+        mesh_obj.active_shape_key_index = 0
+        mesh_obj.show_only_shape_key = True
+    
+    try:
+        depsgraph.update()
+        obj_eval = mesh_obj.evaluated_get(depsgraph)
+        mesh_eval = obj_eval.to_mesh()
+        try:
+            if len(mesh_eval.vertices) != vert_count:
+                return None
+            coords = np.empty(vert_count * 3, dtype=np.float32)
+            mesh_eval.vertices.foreach_get("co", coords)
+            return coords
+        finally:
+            obj_eval.to_mesh_clear()
+    finally:
+        for mod, shown in prev_modifiers:
+            mod.show_viewport = shown
+        mesh_obj.show_only_shape_key = prev_show_only
+        mesh_obj.active_shape_key_index = prev_active_index
+
+def get_deforming_bone_names(arm_obj, tolerance=1e-6):
+    """
+    現在のポーズで実際に頂点を動かすデフォームボーン名の集合を返す
+    
+    スキニング行列（pose_bone.matrix @ bone.matrix_local^-1）が単位行列の
+    ボーンは、ウェイトがあっても頂点を動かさないため除外する。
+    
+    Parameters:
+        arm_obj: アーマチュアオブジェクト
+        tolerance: 単位行列とみなす許容誤差
+        
+    Returns:
+        ボーン名の set
+    """
+    identity = np.identity(4)
+    names = set()
+    for pbone in arm_obj.pose.bones:
+        bone = pbone.bone
+        if not bone.use_deform:
+            continue
+        skin_mat = pbone.matrix @ bone.matrix_local.inverted()
+        if not np.allclose(np.array(skin_mat), identity, atol=tolerance):
+            names.add(pbone.name)
+    return names
+
+def is_deformed_by_bones(mesh_obj, arm_modifier, bone_names):
+    """
+    アーマチュアモディファイアが bone_names のボーンでメッシュを変形させうるか判定する
+    
+    頂点グループ名だけで判定する保守的なチェック（エンベロープ使用時は常に True）。
+    
+    Parameters:
+        mesh_obj: メッシュオブジェクト
+        arm_modifier: 判定するアーマチュアモディファイア
+        bone_names: get_deforming_bone_names() の結果
+        
+    Returns:
+        bool: 変形しうる場合 True
+    """
+    if arm_modifier.use_bone_envelopes or not arm_modifier.use_vertex_groups:
+        return True
+    return any(vg.name in bone_names for vg in mesh_obj.vertex_groups)
+
+# アーマチュア名 → 関連メッシュ名リストの逆引きインデックス（パネル描画用）
+# 初回参照時・ファイル読込やアンドゥ後・オブジェクト数の変化時に全走査で作り直し、
+# それ以外は depsgraph 更新ハンドラで更新されたオブジェクトの分だけ差し替える
+_arm_to_meshes = {}
+_arm_index_dirty = True
+_arm_index_obj_count = -1
+
+def _armature_target_names(obj):
+    """オブジェクトのアーマチュアモディファイアが指すアーマチュア名の集合を返す"""
+    return {
+        mod.object.name for mod in obj.modifiers
+        if mod.type == 'ARMATURE' and mod.object is not None
+    }
+
+def rebuild_armature_mesh_index():
+    """bpy.data.objects を一度だけ走査して逆引きインデックスを作り直す"""
+    global _arm_index_dirty, _arm_index_obj_count
+    _arm_to_meshes.clear()
+    objects = bpy.data.objects
+    for obj in objects:
+        if obj.type == 'MESH':
+            for arm_name in _armature_target_names(obj):
+                _arm_to_meshes.setdefault(arm_name, []).append(obj.name)
+    _arm_index_obj_count = len(objects)
+    _arm_index_dirty = False
+
+def mark_armature_mesh_index_dirty():
+    """次回の参照時に逆引きインデックスを作り直させる"""
+    global _arm_index_dirty
+    _arm_index_dirty = True
+
+def _update_armature_mesh_index(obj):
+    """1オブジェクト分だけ逆引きインデックスを更新する"""
+    name = obj.name
+    for mesh_names in _arm_to_meshes.values():
+        if name in mesh_names:
+            mesh_names.remove(name)
+    if obj.type == 'MESH':
+        for arm_name in _armature_target_names(obj):
+            _arm_to_meshes.setdefault(arm_name, []).append(name)
+
+def _lookup_related_meshes(arm_obj):
+    """逆引きインデックスから関連メッシュを取得する（名前変更等で不整合なら None）"""
+    objects = bpy.data.objects
+    related_meshes = []
+    # bpy.data.objects と同じ名前順で返す
+    for name in sorted(_arm_to_meshes.get(arm_obj.name, ())):
+        obj = objects.get(name)
+        if obj is None or obj.type != 'MESH':
+            return None
+        if not any(mod.type == 'ARMATURE' and mod.object == arm_obj for mod in obj.modifiers):
+            return None
+        related_meshes.append(obj)
+    return related_meshes
+
+def _find_related_mesh_objects_indexed(arm_obj):
+    """
+    逆引きインデックスを使った find_related_mesh_objects（パネル描画用）
+    
+    アーマチュアの名前変更はインデックスに反映されないため、不整合に加えて
+    結果が空の場合も作り直して引き直す。
+    """
+    if _arm_index_dirty or _arm_index_obj_count != len(bpy.data.objects):
+        rebuild_armature_mesh_index()
+        return _lookup_related_meshes(arm_obj) or []
+    
+    related_meshes = _lookup_related_meshes(arm_obj)
+    if not related_meshes:
+        rebuild_armature_mesh_index()
+        related_meshes = _lookup_related_meshes(arm_obj) or []
+    
+    return related_meshes
 
 def find_related_mesh_objects(arm_obj):
     """
     アーマチュアモディファイアで関連付けられたメッシュオブジェクトを検索
     
+    オペレーターから呼ぶため、インデックスは使わず常に bpy.data.objects を走査する。
+    
     Parameters:
         arm_obj: アーマチュアオブジェクト
         
     Returns:
         関連するメッシュオブジェクトのリスト
     """
-    related_meshes = []
+    # 各メッシュは 1 回だけ調べるので、同じアーマチュアを指すモディファイアが
+    # 複数あっても重複しない
+    return [
+        obj for obj in bpy.data.objects
+        if obj.type == 'MESH'
+        and any(mod.type == 'ARMATURE' and mod.object == arm_obj for mod in obj.modifiers)
+    ]
+
+# パネル描画用の関連メッシュキャッシュ
+# {アーマチュア名: (バージョン, メッシュ名のタプル)}。バージョンはオブジェクトや
+# モディファイアが変わるたびに depsgraph 更新ハンドラで進め、古いエントリを無効にする
+# （ファイル読込後に無効になる Python 側の参照を残さないため、名前だけを保持する）
+_mesh_cache = {}
+_mesh_cache_version = 0
+
+# パネル描画用のシェイプキー有無キャッシュ {メッシュオブジェクト名: bool}
+_has_sk_cache = {}
+
+def invalidate_related_mesh_cache():
+    """find_related_mesh_objects_cached / mesh_has_shape_keys_cached のキャッシュを無効化する"""
+    global _mesh_cache_version
+    _mesh_cache_version += 1
+    _mesh_cache.clear()
+    _has_sk_cache.clear()
+
+def find_related_mesh_objects_cached(arm_obj):
+    """
+    find_related_mesh_objects のキャッシュ付き版（UI の再描画用）
     
-    # アーマチュアモディファイアで関連付けられたメッシュを検索
-    for obj in bpy.data.objects:
-        if obj.type == 'MESH':
-            for modifier in obj.modifiers:
-                if modifier.type == 'ARMATURE' and modifier.object == arm_obj:
-                    if obj not in related_meshes:
-                        related_meshes.append(obj)
+    オペレーターの処理では常に最新の状態を使うため find_related_mesh_objects を呼ぶこと。
     
+    Parameters:
+        arm_obj: アーマチュアオブジェクト
+        
+    Returns:
+        関連するメッシュオブジェクトのリスト
+    """
+    entry = _mesh_cache.get(arm_obj.name)
+    if entry is not None and entry[0] == _mesh_cache_version:
+        objects = bpy.data.objects
+        related_meshes = [objects.get(name) for name in entry[1]]
+        if None not in related_meshes:
+            return related_meshes
+    related_meshes = _find_related_mesh_objects_indexed(arm_obj)
+    _mesh_cache[arm_obj.name] = (_mesh_cache_version, tuple(m.name for m in related_meshes))
     return related_meshes
 
+def clear_caches():
+    """
+    このモジュールのキャッシュ（関連メッシュ・逆引きインデックス・シェイプキー有無）をすべて破棄する
+    
+    ファイル読込時・アドオン解除時に呼ぶ。キャッシュはすべて名前をキーにしており、
+    Blender のオブジェクト参照は保持しない。
+    """
+    invalidate_related_mesh_cache()
+    _arm_to_meshes.clear()
+    mark_armature_mesh_index_dirty()
+
+def mesh_has_shape_keys_cached(mesh_obj):
+    """
+    メッシュがシェイプキーを持つかを返す（UI の再描画用キャッシュ付き）
+    
+    Parameters:
+        mesh_obj: メッシュオブジェクト
+        
+    Returns:
+        bool: シェイプキーを1つ以上持つ場合 True
+    """
+    name = mesh_obj.name
+    has_shape_keys = _has_sk_cache.get(name)
+    if has_shape_keys is None:
+        shape_keys = mesh_obj.data.shape_keys
+        has_shape_keys = shape_keys is not None and len(shape_keys.key_blocks) > 0
+        _has_sk_cache[name] = has_shape_keys
+    return has_shape_keys
+
+@persistent
+def related_mesh_cache_depsgraph_handler(scene, depsgraph):
+    """オブジェクト（モディファイア含む）やコレクションが更新されたらキャッシュを無効化する"""
+    # モディファイアスタックの変更はジオメトリ更新として通知される
+    if not _arm_index_dirty:
+        for update in depsgraph.updates:
+            if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+                _update_armature_mesh_index(update.id.original)
+    
+    if (depsgraph.id_type_updated('OBJECT')
+            or depsgraph.id_type_updated('COLLECTION')
+            or depsgraph.id_type_updated('SCENE')):
+        invalidate_related_mesh_cache()
+    elif depsgraph.id_type_updated('MESH') or depsgraph.id_type_updated('SHAPEKEY'):
+        # シェイプキーの追加・削除はメッシュ／シェイプキーの更新として通知される
+        _has_sk_cache.clear()
+
+@persistent
+def related_mesh_cache_undo_handler(*_args):
+    """アンドゥ・リドゥでオブジェクトが作り直されるのでキャッシュを無効化する"""
+    invalidate_related_mesh_cache()
+    mark_armature_mesh_index_dirty()
+
 def apply_shape_key_as_basis(obj, key_name):
     """
     指定したシェイプキーをBasisとして適用し、
@@ -62,76 +462,80 @@ def apply_shape_key_as_basis(obj, key_name):
         return
         
     kb = obj.data.shape_keys.key_blocks
-    if key_name not in kb:
+    # 名前 → インデックスの対応を一度だけ作り、kb.find() の線形探索を繰り返さない
+    name_to_idx = {k.name: i for i, k in enumerate(kb)}
+    new_basis_idx = name_to_idx.get(key_name)
+    if new_basis_idx is None:
         raise ValueError(f"Shape key '{key_name}' not found")
     
     write_log(f"Applying shape key '{key_name}' as new Basis")
     
-    # 新しいBasisとなるシェイプキーをアクティブにする
-    new_basis_key = kb[key_name]
-    new_basis_key.value = 1.0
+    new_basis_key = kb[new_basis_idx]
     
     # Basisキーを取得（通常は最初のキー）
-    basis_key = kb[0] if len(kb) > 0 else None
+    basis_key = kb[0]
+    basis_name = basis_key.name
     
     # 保存対象のシェイプキーリストを作成（BassiとnewBasis以外）
     shape_keys_to_process = [
-        key for key in kb 
-        if key != new_basis_key and key != basis_key and key.name != 'Basis'
+        kb[i] for name, i in name_to_idx.items()
+        if i != new_basis_idx and i != 0 and name != 'Basis'
     ]
     
     write_log(f"Found {len(shape_keys_to_process)} shape keys to rebuild")
     
-    # 各シェイプキーに対して処理
+    coord_len = len(obj.data.vertices) * 3
+    basis_co = np.empty(coord_len, dtype=np.float32)
+    basis_key.data.foreach_get("co", basis_co)
+    
+    # 他のキーの相対キーになっているキーは、書き換える前の座標を控えておく
+    # （混合形状は常に元の座標同士の差分で求める）
+    ref_names = {k.relative_key.name for k in shape_keys_to_process}
+    ref_names.add(new_basis_key.relative_key.name)
+    ref_names.discard(basis_name)
+    ref_coords = {}
+    for name in ref_names:
+        ref_coords[name] = np.empty(coord_len, dtype=np.float32)
+        kb[name].data.foreach_get("co", ref_coords[name])
+    
+    def _mixed_coords(shape_key, out):
+        """シェイプキーを単独で 1.0 にした時の混合形状 B + (C - R) を out に求める"""
+        shape_key.data.foreach_get("co", out)
+        ref_name = shape_key.relative_key.name
+        if ref_name != basis_name:
+            out -= ref_coords[ref_name]
+            out += basis_co
+        return out
+    
+    # 新しいBasisの形状（キーを書き換える前に求める）
+    new_basis_co = None
+    if new_basis_idx != 0:
+        new_basis_co = _mixed_coords(new_basis_key, np.empty(coord_len, dtype=np.float32))
+    
+    # 各シェイプキーを元のBasis基準の絶対形状に書き換える
+    # （相対キーが Basis のキーは形状が変わらないので書き込まない）
+    # Basis を差し替えても各キーの絶対座標はそのまま保たれ、差分だけが新しいBasis基準になる
+    co = np.empty(coord_len, dtype=np.float32)
     for shape_key in shape_keys_to_process:
-        # 元の値を保存
-        original_name = shape_key.name
-        original_value = shape_key.value
-        write_log(f"Rebuilding shape key: {original_name}")
-        
-        # すべてのシェイプキーを非アクティブにする
-        for k in kb:
-            k.value = 0.0
-            
-        # 処理対象のシェイプキーをアクティブにする
-        shape_key.value = 1.0
-        
-        # 現在の混合形状で一時キーを作成
-        bpy.ops.object.shape_key_add(from_mix=True)
-        # 最後に追加されたシェイプキーを取得
-        temp_key = kb[-1]
-        # 名前を変更
-        temp_key.name = "temp"
-        
-        # 元のシェイプキーを削除
-        obj.active_shape_key_index = kb.find(original_name)
-        bpy.ops.object.shape_key_remove()
+        write_log("Rebuilding shape key: %s", shape_key.name)
         
-        # 一時キーを元の名前にリネーム
-        temp_key.name = original_name
-        temp_key.value = original_value
-    
-    # 最後に新しいBasisを作成
-    # すべてのキーを非アクティブにする
-    for k in kb:
-        k.value = 0.0
-        
-    # 新しいBasisとなるキーをアクティブにする
-    new_basis_key.value = 1.0
-    
-    # 現在のアクティブシェイプキーを先頭に移動
-    obj.active_shape_key_index = kb.find(key_name)
-    bpy.ops.object.shape_key_move(type='TOP')
+        if shape_key.relative_key.name == basis_name:
+            continue
+        shape_key.data.foreach_set("co", _mixed_coords(shape_key, co))
+        shape_key.relative_key = basis_key
     
-    # 元のBasisを削除
-    bpy.ops.object.shape_key_remove()
+    # 新しいBasisの形状を参照キーとメッシュ頂点に直接書き込み、元のキーは削除する
+    # （キーの移動・追加・削除にオペレーターは使わない）
+    if new_basis_co is not None:
+        basis_key.data.foreach_set("co", new_basis_co)
+        obj.data.vertices.foreach_set("co", new_basis_co)
+        obj.shape_key_remove(new_basis_key)
+    basis_key.name = 'Basis'
     
-    # 現在の形状で新しいBasisを作成
-    bpy.ops.object.shape_key_add(from_mix=True)
-    # 最後に追加されたシェイプキーを最初に移動
-    bpy.ops.object.shape_key_move(type='TOP')
-    # 名前をBasisに変更
-    kb[0].name = 'Basis'
+    # すべてのキーを非アクティブにする（foreach_set で一度に書き込む）
+    kb.foreach_set("value", np.zeros(len(kb), dtype=np.float32))
+    obj.active_shape_key_index = 0
+    obj.data.update()
     
     write_log("Shape key basis rebuilt with all dependent keys adjusted")
 
@@ -139,10 +543,10 @@ def remove_shape_key(obj, key_name):
     """シェイプキーを削除"""
     if not obj.data.shape_keys:
         return
-    idx = obj.data.shape_keys.key_blocks.find(key_name)
-    if idx != -1:
-        obj.active_shape_key_index = idx
-        bpy.ops.object.shape_key_remove()
+    # オペレーターを介さずに削除する（アンドゥ登録・通知・コンテキスト検証が発生しない）
+    key_block = obj.data.shape_keys.key_blocks.get(key_name)
+    if key_block is not None:
+        obj.shape_key_remove(key_block)
 
 def rename_shape_key(obj, old_name, new_name):
     """シェイプキーの名前を変更"""
@@ -152,7 +556,7 @@ def rename_shape_key(obj, old_name, new_name):
     if old_name in kb:
         kb[old_name].name = new_name
 
-def apply_new_armature_modifier(mesh_obj, arm_obj, report_fn):
+def apply_new_armature_modifier(mesh_obj, arm_obj, report_fn, deforming_bones=None):
     """
     既存のアーマチュアモディファイアはそのままにし、新しいモディファイアを追加して適用する
     
@@ -160,16 +564,19 @@ def apply_new_armature_modifier(mesh_obj, arm_obj, report_fn):
         mesh_obj: メッシュオブジェクト
         arm_obj: アーマチュアオブジェクト
         report_fn: レポート用関数
+        deforming_bones: 現在のポーズで動くボーン名の集合（省略時はここで求める）
     """
-    # オブジェクトモードに切り替え
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # メッシュオブジェクトをアクティブに
-    bpy.context.view_layer.objects.active = mesh_obj
-    mesh_obj.select_set(True)
+    # 新しいモディファイアは頂点グループのみで変形するので、動いたボーンの
+    # 頂点グループを持たないメッシュは適用しても形が変わらない
+    if deforming_bones is None:
+        deforming_bones = get_deforming_bone_names(arm_obj)
+    if not any(vg.name in deforming_bones for vg in mesh_obj.vertex_groups):
+        write_log(f"Skipping armature modifier apply for '{mesh_obj.name}': no effective deformation")
+        return True
     
-    # アーマチュアオブジェクトは選択しない
-    arm_obj.select_set(False)
+    # オブジェクトモードに切り替え（既にオブジェクトモードなら何もしない）
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
     
     write_log("Adding new armature modifier for application...")
     
@@ -178,9 +585,16 @@ def apply_new_armature_modifier(mesh_obj, arm_obj, report_fn):
     mod.object = arm_obj
     
     # 新しく追加したモディファイアを適用
+    # メッシュのアクティブ化・選択はビューレイヤーを変更せずオーバーライドで行う
     try:
         write_log(f"Applying new armature modifier: {mod.name}")
-        bpy.ops.object.modifier_apply(modifier=mod.name)
+        with bpy.context.temp_override(
+            active_object=mesh_obj,
+            object=mesh_obj,
+            selected_objects=[mesh_obj],
+            selected_editable_objects=[mesh_obj],
+        ):
+            bpy.ops.object.modifier_apply(modifier=mod.name)
         print_and_log(report_fn, 'INFO', f"Applied new armature modifier")
     except Exception as e:
         print_and_log(report_fn, 'WARNING', f"Failed to apply modifier: {e}")